@@ -13,6 +13,16 @@ SIMPSON_LD_LIBRARY_PATH=""
 SIMPSON_EXAMPLES_PATH="C:\\data\\workspace_before_2021\\simpson_GUI\\newer\\examples"
 LOCALE_ENCODING="cp852"  # to find out on windows, execute in cmd.exe command chcp
 EDITOR_FONT_SIZE=11
+SIMVIEW_CACHE_PATH=""  # directory for simview caches, empty string means ~/.simview_cache
+FIDSPE_CACHE_SIZE_MB=500  # size limit of parsed FID/SPE data cache, 0 disables the cache
+RESULT_CACHE_SIZE_MB=1000  # size limit of cached SIMPSON results (output files and log), 0 disables the cache
+RESULT_CACHE_MAX_AGE_DAYS=30  # cached SIMPSON results older than this are removed
+SIMPSON_MAX_JOBS=0  # number of SIMPSON calculations running at the same time, 0 means number of CPU cores
+OUTPUT_MAX_LINES=20000  # number of lines kept in SIMPSON output window, older lines are discarded
+CHART_FRAME_RATE=60  # maximum number of chart updates per second during pan, zoom, scroll and crosshair moves
+CHART_FAST_PAN=True  # while panning shift rendered image of the plot, render it again when the mouse is released
+STORE_SINGLE_PRECISION=False  # keep data of plotted lines as complex64, halves memory at the cost of precision
+STARTUP_TIME_BUDGET=1.0  # seconds from start until the window is shown, longer startup is reported in red in the Log
 
 #These settings worked flawlessly on a fresh Ubuntu 21.04 install
 
@@ -22,15 +32,24 @@ EDITOR_FONT_SIZE=11
 
 # -------- DO  NOT  EDIT  BELOW  THIS  LINE  -----------
 
-from PyQt5.QtCore import Qt, QRegExp, QProcess, QLocale
-from PyQt5.QtGui import QFont, QSyntaxHighlighter, QTextCharFormat, QFontDatabase, QCursor, QKeySequence
-from PyQt5.QtWidgets import (QApplication, QMainWindow, QVBoxLayout, QPlainTextEdit, QLabel, QFrame, QSplitter, QToolBar, QCheckBox, QAction, QMessageBox, QFileDialog, QLineEdit, QMenu, QSizePolicy, QShortcut, QInputDialog, QDialog, QListWidget, QPushButton, QDoubleSpinBox)
-import sys, os, glob
-import matplotlib
-matplotlib.use('Qt5Agg')
-from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
-from matplotlib.figure import Figure
+import sys, time
+startup_time = time.perf_counter()  # startup is measured from here, see STARTUP_TIME_BUDGET
+# command-line batch mode (python simview.py --batch ...) does not need Qt, see simview_batch.py
+if __name__ == '__main__' and '--batch' in sys.argv[1:]:
+    import simview_batch
+    sys.exit(simview_batch.main(sys.argv[1:], {name: value for name, value in globals().items() if name.isupper()}))
+
+from PyQt5.QtCore import Qt, QProcess, QObject, QRunnable, QThreadPool, QTimer, pyqtSignal
+from PyQt5.QtGui import QFont, QSyntaxHighlighter, QTextCharFormat, QTextCursor, QFontDatabase, QKeySequence
+from PyQt5.QtWidgets import (QApplication, QTabWidget, QTabBar, QMainWindow, QVBoxLayout, QPlainTextEdit, QLabel, QFrame, QSplitter, QToolBar, QCheckBox, QAction, QMessageBox, QFileDialog, QLineEdit, QSizePolicy, QShortcut, QInputDialog, QDialog, QPushButton, QDoubleSpinBox, QProgressBar)
+import os, re, glob, bisect, codecs, tempfile
+import concurrent.futures, contextlib, itertools, multiprocessing
 import numpy as np
+from simview_core import (simview_cache_path, import_simpson_fidspe, read_simpson_fidspe, simpson_xaxis, FidSpeCache,
+                          ResultCache, simpson_run_key, directory_snapshot, simpson_output_files, ParallelRun,
+                          parse_sweep_values, substitute_parameter, read_json_cache, write_json_cache, simpson_example_files,
+                          compile_keywords, load_keyword_tables, copy_simpson_input, simpson_local_input_files)
+# matplotlib and the chart (simview_chart.py) are imported after the window is shown
 
 class MainWindow(QMainWindow):
     
@@ -40,13 +59,40 @@ class MainWindow(QMainWindow):
         
         # get logical DPI of screen
         screen = QApplication.primaryScreen()
-        current_dpi = screen.logicalDotsPerInch()
+        self.current_dpi = screen.logicalDotsPerInch()
 
         # default values of global variables
         self.input_file_name = None
         self.input_file_changed = False
         self.input_file_is_example = False
-        self.simpson_process = None  # indicator of running simpson calculation
+        # SIMPSON calculations are queued and run concurrently, each has its own output tab
+        self.job_scheduler = JobScheduler(SIMPSON_MAX_JOBS)
+        self.job_scheduler.changed.connect(self.update_job_status)
+        self.job_of_console = {}
+        # runs of unchanged inputs restore output files and log instead of running SIMPSON again
+        self.result_cache = ResultCache(os.path.join(simview_cache_path(SIMVIEW_CACHE_PATH), "results"), RESULT_CACHE_SIZE_MB, RESULT_CACHE_MAX_AGE_DAYS)
+        self.fidspe_labels = {}  # chart labels of FID/SPE files given by their path, file name is used otherwise
+        self.fidspe_cache = FidSpeCache(os.path.join(simview_cache_path(SIMVIEW_CACHE_PATH), "fidspe"), FIDSPE_CACHE_SIZE_MB)
+        # FID/SPE files are parsed in worker threads, results are delivered by signals
+        self.load_pool = QThreadPool()
+        self.load_signals = FidSpeLoadSignals()
+        self.load_signals.loaded.connect(self.handle_fidspe_loaded)
+        self.load_signals.failed.connect(self.handle_fidspe_failed)
+        # files finished shortly one after another are added to the chart in one batch
+        self.loaded_fidspe = []
+        self.loaded_timer = QTimer()
+        self.loaded_timer.setSingleShot(True)
+        self.loaded_timer.setInterval(50)
+        self.loaded_timer.timeout.connect(self.add_loaded_fidspe)
+        self.load_generation = 0  # increased on cancel, results of older loads are ignored
+        self.loads_pending = 0
+        self.loads_total = 0
+        # bulk import of many files uses a pool of processes (created at first use)
+        self.import_executor = None
+        self.import_futures = []
+        self.import_results = []
+        self.import_remaining = 0
+        self.load_signals.imported.connect(self.handle_fidspe_imported)
 
         # setting main window geometry
         self.setGeometry(100, 100, 800, 600)
@@ -65,8 +111,7 @@ class MainWindow(QMainWindow):
         # connect syntax highlighter
         self.highlighter = Highlighter(self.editor.document())
         # create simpson output text box
-        self.simpsonoutput = QPlainTextEdit()
-        self.simpsonoutput.setReadOnly(True)
+        self.simpsonoutput = OutputConsole(OUTPUT_MAX_LINES)
                 
         # arrange editor and simpson output to a splitter (left part of the main window)
         self.textsplitter = QSplitter(Qt.Vertical)
@@ -78,27 +123,36 @@ class MainWindow(QMainWindow):
         editorframe.setStyleSheet("background-color: rgb(255, 255, 204)")
         self.textsplitter.addWidget(editorframe)
         # embed simpson output label and textbox in its own frame and add it to the splitter
+        # first tab keeps general messages, every calculation adds a tab with its output
+        self.outputtabs = QTabWidget()
+        self.outputtabs.setTabsClosable(True)
+        self.outputtabs.tabCloseRequested.connect(self.close_output_tab)
+        self.outputtabs.addTab(self.simpsonoutput, "Log")
+        self.outputtabs.tabBar().setTabButton(0, QTabBar.RightSide, None)
         outputframe = QFrame()
         layout = QVBoxLayout()
         lbl = QLabel();
         lbl.setText("SIMPSON output")
         layout.addWidget(lbl)
-        layout.addWidget(self.simpsonoutput)
+        layout.addWidget(self.outputtabs)
         outputframe.setLayout(layout)
         outputframe.setStyleSheet("background-color: rgb(255, 204, 204)")
         self.textsplitter.addWidget(outputframe)
         # adjust initial sizes of the splitter (sum matches main window height)
         self.textsplitter.setSizes([600,200])
 
-        # Create the maptlotlib FigureCanvas object,
-        self.canvas = MplCanvas(self, width=5, height=4, dpi=current_dpi)
+        # the maptlotlib FigureCanvas object is created by create_canvas after the window is shown,
+        # until then a placeholder keeps its place
+        self.canvas = None
+        self.chartplaceholder = QLabel("Loading chart ...")
+        self.chartplaceholder.setAlignment(Qt.AlignCenter)
         
         # layout of the central widget will be in a splitter container (horizontally)
         self.mainsplitter = QSplitter(Qt.Horizontal)
         # adding textframes (= editor and output, contained in the first splitter) to the layout
         self.mainsplitter.addWidget(self.textsplitter)
-        # adding canvas to the layout
-        self.mainsplitter.addWidget(self.canvas)
+        # adding canvas placeholder to the layout
+        self.mainsplitter.addWidget(self.chartplaceholder)
         # adjusting initial sizes (sum matches main window width)
         self.mainsplitter.setSizes([300,300])
         self.storedMainSplitterSizes = self.mainsplitter.sizes()
@@ -119,8 +173,18 @@ class MainWindow(QMainWindow):
         self.findentry = QLineEdit()
         fm = self.findentry.fontMetrics()
         self.findentry.setFixedWidth(16*fm.width('x'))
-        self.findentry.textEdited.connect(self.findTextHighlight)
+        # highlight matches after typing stops for a while, not after each character
+        self.findTimer = QTimer()
+        self.findTimer.setSingleShot(True)
+        self.findTimer.setInterval(250)
+        self.findTimer.timeout.connect(self.findTextHighlight)
+        self.findentry.textEdited.connect(self.findTimer.start)
+        self.findentry.returnPressed.connect(self.find_next)
         editorbar.addWidget(self.findentry)
+        self.findcount = QLabel()
+        editorbar.addWidget(self.findcount)
+        # match count is updated when the text is edited (not when it is highlighted)
+        self.editor.document().contentsChange.connect(self.find_text_changed)
         # spacer
         toolbarspacer = QLabel();
         toolbarspacer.setText("Chart: ")
@@ -132,28 +196,25 @@ class MainWindow(QMainWindow):
         # mpl_toolbar = NavigationToolbar2QT(self.canvas, self)
         # editorbar.addWidget(mpl_toolbar)
         self.addToolBar(editorbar)
-        chartbar = QToolBar("Chart tools")
-        chartbar.addWidget(toolbarspacer)
-        toolcursor = QCheckBox("Crosshair ")
-        toolcursor.setChecked(False)
-        toolcursor.setShortcut('Ctrl+Q')
-        toolcursor.setToolTip("Toggle crosshair cursor Crtl+Q")
-        toolcursor.clicked.connect(self.canvas.handle_crosshair_cursor)
-        self.canvas.addToolcursor(toolcursor)
-        chartbar.addWidget(toolcursor)
-        toolxreverse = QCheckBox("x-reverse ")
-        toolxreverse.setChecked(False)
-        toolxreverse.setToolTip("Toggle x-axis direction")
-        toolxreverse.clicked.connect(self.canvas.handle_xrev)
-        self.canvas.addToolxrev(toolxreverse)
-        chartbar.addWidget(toolxreverse)
+        # chart tools are connected to the canvas and enabled by create_canvas
+        self.chartbar = QToolBar("Chart tools")
+        self.chartbar.addWidget(toolbarspacer)
+        self.toolcursor = QCheckBox("Crosshair ")
+        self.toolcursor.setChecked(False)
+        self.toolcursor.setShortcut('Ctrl+Q')
+        self.toolcursor.setToolTip("Toggle crosshair cursor Crtl+Q")
+        self.chartbar.addWidget(self.toolcursor)
+        self.toolxreverse = QCheckBox("x-reverse ")
+        self.toolxreverse.setChecked(False)
+        self.toolxreverse.setToolTip("Toggle x-axis direction")
+        self.chartbar.addWidget(self.toolxreverse)
         
-        print_action = QAction("Export", self)
-        print_action.setToolTip("Save figure to file Ctrl+E")
-        print_action.setShortcut('Ctrl+E')
-        print_action.triggered.connect(self.canvas.export_figure)
-        chartbar.addAction(print_action)
-        self.addToolBar(chartbar)
+        self.print_action = QAction("Export", self)
+        self.print_action.setToolTip("Save figure to file Ctrl+E")
+        self.print_action.setShortcut('Ctrl+E')
+        self.chartbar.addAction(self.print_action)
+        self.chartbar.setEnabled(False)
+        self.addToolBar(self.chartbar)
         
         # creating a file menu
         file_menu = self.menuBar().addMenu("&File")
@@ -191,6 +252,21 @@ class MainWindow(QMainWindow):
         load_graph_data_action.setStatusTip("Load FID/SPE file to display")
         load_graph_data_action.triggered.connect(self.file_load_fidspe)
         file_menu.addAction(load_graph_data_action)
+        # import many files at once
+        load_many_action = QAction("Import many FID/SPE", self)
+        load_many_action.setShortcut('Ctrl+Shift+I')
+        load_many_action.setStatusTip("Load several FID/SPE files to display")
+        load_many_action.triggered.connect(self.file_load_fidspe_many)
+        file_menu.addAction(load_many_action)
+        load_dir_action = QAction("Import directory", self)
+        load_dir_action.setStatusTip("Load all FID/SPE files from a directory")
+        load_dir_action.triggered.connect(self.file_load_fidspe_directory)
+        file_menu.addAction(load_dir_action)
+        # clear cache of parsed FID/SPE files
+        clear_cache_action = QAction("Clear FID/SPE cache", self)
+        clear_cache_action.setStatusTip("Delete cached FID/SPE data")
+        clear_cache_action.triggered.connect(self.fidspe_cache.clear)
+        file_menu.addAction(clear_cache_action)
         # load test random sin wave for testing
         load_wave_data_action = QAction("Load wave", self)
         load_wave_data_action.setStatusTip("Load sin wave to display")
@@ -235,6 +311,18 @@ class MainWindow(QMainWindow):
         redo_edit_action.setStatusTip("Cancel last undo action")
         redo_edit_action.triggered.connect(self.editor.redo)
         edit_menu.addAction(redo_edit_action)
+        edit_menu.addSeparator()
+        # creating Find next / previous actions
+        findnext_edit_action = QAction("Find next", self)
+        findnext_edit_action.setShortcut('F3')
+        findnext_edit_action.setStatusTip("Select next occurrence of Find text")
+        findnext_edit_action.triggered.connect(self.find_next)
+        edit_menu.addAction(findnext_edit_action)
+        findprev_edit_action = QAction("Find previous", self)
+        findprev_edit_action.setShortcut('Shift+F3')
+        findprev_edit_action.setStatusTip("Select previous occurrence of Find text")
+        findprev_edit_action.triggered.connect(self.find_previous)
+        edit_menu.addAction(findprev_edit_action)
 
         # creating a Process menu
         process_menu = self.menuBar().addMenu("&Process")
@@ -244,27 +332,67 @@ class MainWindow(QMainWindow):
         run_process_action.setStatusTip("Execute current input")
         run_process_action.triggered.connect(self.process_run)
         process_menu.addAction(run_process_action)
+        # creating Force run process action
+        forcerun_process_action = QAction("Run without cache", self)
+        forcerun_process_action.setShortcut('Ctrl+Alt+R')
+        forcerun_process_action.setStatusTip("Execute current input even if its result is cached")
+        forcerun_process_action.triggered.connect(self.process_run_force)
+        process_menu.addAction(forcerun_process_action)
+        # creating Queue input files action
+        queue_process_action = QAction("Queue input files", self)
+        queue_process_action.setShortcut('Ctrl+Shift+R')
+        queue_process_action.setStatusTip("Run several input files from disc")
+        queue_process_action.triggered.connect(self.process_queue_files)
+        process_menu.addAction(queue_process_action)
+        # creating Parameter sweep action
+        sweep_process_action = QAction("Parameter sweep", self)
+        sweep_process_action.setStatusTip("Run current input for a grid of parameter values")
+        sweep_process_action.triggered.connect(self.process_sweep)
+        process_menu.addAction(sweep_process_action)
+        # creating Parallel run actions
+        parallel_process_action = QAction("Parallel run", self)
+        parallel_process_action.setShortcut('Ctrl+Shift+P')
+        parallel_process_action.setStatusTip("Split crystallites of current input to several SIMPSON processes")
+        parallel_process_action.triggered.connect(self.process_run_parallel)
+        process_menu.addAction(parallel_process_action)
+        verify_process_action = QAction("Parallel run and verify", self)
+        verify_process_action.setStatusTip("Parallel run compared with single-process run of current input")
+        verify_process_action.triggered.connect(self.process_run_parallel_verify)
+        process_menu.addAction(verify_process_action)
         # creating Kill process action
         kill_process_action = QAction("Kill", self)
         kill_process_action.setShortcut('Ctrl+K')
-        kill_process_action.setStatusTip("Kill running process")
+        kill_process_action.setStatusTip("Kill calculation shown in output window")
         kill_process_action.triggered.connect(self.process_kill)
         process_menu.addAction(kill_process_action)
+        # creating Kill all process action
+        killall_process_action = QAction("Kill all", self)
+        killall_process_action.setShortcut('Ctrl+Shift+K')
+        killall_process_action.setStatusTip("Kill all running and queued calculations")
+        killall_process_action.triggered.connect(self.job_scheduler.kill_all)
+        process_menu.addAction(killall_process_action)
         # creating Clear output process action
         clearoutput_process_action = QAction("Clear output log", self)
         clearoutput_process_action.setShortcut('Ctrl+L')
         clearoutput_process_action.setStatusTip("Clear SIMPSON output window")
         clearoutput_process_action.triggered.connect(self.process_clearoutput)
         process_menu.addAction(clearoutput_process_action)
+        # creating Clear result cache process action
+        clearcache_process_action = QAction("Clear result cache", self)
+        clearcache_process_action.setStatusTip("Delete cached results of SIMPSON calculations")
+        clearcache_process_action.triggered.connect(self.result_cache.clear)
+        process_menu.addAction(clearcache_process_action)
 
         # creating a Examples menu
-        examples_menu = self.menuBar().addMenu("&Examples")
-        # populating Examples with files on disk
-        for examplefile in glob.glob(os.path.join(SIMPSON_EXAMPLES_PATH,"*.in")):
-            examples_action = QAction(os.path.basename(examplefile), self)
-            examples_action.setStatusTip("Load selected Example file")
-            examples_action.triggered.connect(self.example_item_triggered)
-            examples_menu.addAction(examples_action)
+        self.examples_menu = self.menuBar().addMenu("&Examples")
+        # populating Examples with files listed at previous launch, examples path (possibly
+        # a network share) is searched in background and the menu is updated when it differs
+        self.examples_cache_file = os.path.join(simview_cache_path(SIMVIEW_CACHE_PATH), "examples.json")
+        self.examples = read_json_cache(self.examples_cache_file, SIMPSON_EXAMPLES_PATH)
+        self.populate_examples_menu()
+        self.examples_signals = ExamplesScanSignals()
+        self.examples_signals.listed.connect(self.handle_examples_listed)
+        QThreadPool.globalInstance().start(ExamplesScanTask(SIMPSON_EXAMPLES_PATH, self.examples_cache_file, self.examples_signals))
 
         # creating Chart menu
         clear_menu = self.menuBar().addMenu("&Chart")
@@ -294,9 +422,63 @@ class MainWindow(QMainWindow):
         process_help_action.triggered.connect(self.help_process)
         help_menu.addAction(process_help_action)
 
+        # progress of background loading of FID/SPE files shown in status bar
+        self.load_progress = QProgressBar()
+        self.load_progress.setMaximumWidth(200)
+        self.load_cancel = QPushButton("Cancel loading")
+        self.load_cancel.clicked.connect(self.cancel_fidspe_loading)
+        # number of running and queued calculations
+        self.job_status = QLabel()
+        self.statusBar().addPermanentWidget(self.job_status)
+        self.statusBar().addPermanentWidget(self.load_progress)
+        self.statusBar().addPermanentWidget(self.load_cancel)
+        self.load_progress.hide()
+        self.load_cancel.hide()
+
         self.update_title()
         # show the whole thing up
         self.show()
+        # keyword tables and the chart are created when the event loop runs, after the window is shown
+        QTimer.singleShot(0, self.finish_startup)
+
+    # load what is not needed to show the window
+    def finish_startup(self):
+        shown_time = time.perf_counter() - startup_time
+        self.highlighter.load_keywords()
+        self.create_canvas()
+        self.report_startup_time(shown_time, time.perf_counter() - startup_time)
+
+    # create the chart (imports matplotlib), done also on demand when some data are added before
+    def create_canvas(self):
+        if self.canvas is not None:
+            return
+        from simview_chart import MplCanvas
+        self.canvas = MplCanvas(self, width=5, height=4, dpi=self.current_dpi, frame_rate=CHART_FRAME_RATE,
+                                fast_pan=CHART_FAST_PAN, single_precision=STORE_SINGLE_PRECISION)
+        sizes = self.mainsplitter.sizes()
+        self.mainsplitter.replaceWidget(1, self.canvas)
+        self.mainsplitter.setSizes(sizes)
+        self.chartplaceholder.deleteLater()
+        self.toolcursor.clicked.connect(self.canvas.handle_crosshair_cursor)
+        self.canvas.addToolcursor(self.toolcursor)
+        self.toolxreverse.clicked.connect(self.canvas.handle_xrev)
+        self.canvas.addToolxrev(self.toolxreverse)
+        self.print_action.triggered.connect(self.canvas.export_figure)
+        self.chartbar.setEnabled(True)
+
+    # startup times in the Log, window shown later than STARTUP_TIME_BUDGET in red
+    def report_startup_time(self, shown_time, ready_time):
+        text = "Startup: window shown in %.2f s, chart ready in %.2f s\n" % (shown_time, ready_time)
+        if shown_time <= STARTUP_TIME_BUDGET:
+            self.simpson_output_append(text)
+            return
+        print(text.rstrip()+", budget is %.2f s" % STARTUP_TIME_BUDGET)
+        usual_charformat = self.simpsonoutput.currentCharFormat()
+        charformat = QTextCharFormat()
+        charformat.setForeground(Qt.red)
+        self.simpsonoutput.setCurrentCharFormat(charformat)
+        self.simpson_output_append(text.rstrip()+" (budget %.2f s)\n" % STARTUP_TIME_BUDGET)
+        self.simpsonoutput.setCurrentCharFormat(usual_charformat)
                        
         
     # method to hide editor or restore previous state    
@@ -396,8 +578,11 @@ class MainWindow(QMainWindow):
             # update path value
             self.input_file_name = fileName
             self.input_file_is_example = isExample
-            # update the text
-            self.editor.setPlainText(text)
+            # update the text, only the visible part is highlighted right away
+            with self.highlighter.deferred_highlighting():
+                self.editor.setPlainText(text)
+            visible_lines = self.editor.viewport().height() // self.editor.fontMetrics().lineSpacing() + 1
+            self.highlighter.highlight_progressively(self.editor.firstVisibleBlock(), visible_lines)
             # update the title
             self.update_title()
         
@@ -464,7 +649,7 @@ class MainWindow(QMainWindow):
             self.update_title()        
 
     # process Run action        
-    def process_run(self):
+    def process_run(self, checked=False, force=False):
         print("Triggered Run action")
         # check for un-saved input file
         if not self.check_file_is_saved("Run SIMPSON calculation"):
@@ -473,119 +658,219 @@ class MainWindow(QMainWindow):
         if self.input_file_name is None:
             self.dialog_critical("There is no proper input file")
             return
-        if self.simpson_process is None:
-            # create QProcess instance and connect slots to display output
-            self.simpson_process =  QProcess() 
-            self.simpson_process.readyReadStandardOutput.connect(self.handle_simpson_stdout)
-            self.simpson_process.readyReadStandardError.connect(self.handle_simpson_stderr)
-            self.simpson_process.finished.connect(self.handle_simpson_finished)  # Clean up once complete.
-            self.simpson_process.errorOccurred.connect(self.handle_simpson_errorOccured)
-            # decorations
-            self.simpsonoutput.setStyleSheet("background-color: rgb(100, 255, 100)")
-            usual_charformat = self.simpsonoutput.currentCharFormat()
-            charformat = QTextCharFormat()
-            charformat.setFontWeight(QFont.Bold)
-            charformat.setFontItalic(True)
-            self.simpsonoutput.setCurrentCharFormat(charformat)
-            workdir, inputfile = os.path.split(self.input_file_name)
-            #self.simpsonoutput.appendPlainText("Executing %s\n\n"  %inputfile)
-            self.simpson_output_append("Executing %s\n"  %inputfile)
-            self.simpsonoutput.setCurrentCharFormat(usual_charformat)
-            self.simpson_output_append("Directory: %s\n"  %workdir)
-            # execute input file
-            # self.simpson_process.start("python3", ['dummy_script.py'])  # used during test phase
-            self.simpson_output_append(SIMPSON_EXECUTABLE+" "+inputfile+"\n")
-            env = self.simpson_process.processEnvironment()
-            env.insert("TCL_LIBRARY",SIMPSON_TCL_LIBRARY)
-            env.insert("LD_LIBRARY_PATH",SIMPSON_LD_LIBRARY_PATH)
-            self.simpson_process.setProcessEnvironment(env)
-            self.simpson_process.setWorkingDirectory(workdir)
-            self.simpson_process.start(SIMPSON_EXECUTABLE, [inputfile])
+        self.submit_job(self.input_file_name, force=force)
+
+    # process Run without cache action
+    def process_run_force(self):
+        self.process_run(force=True)
+
+    # process Queue input files action
+    def process_queue_files(self):
+        paths, _ = QFileDialog.getOpenFileNames(self, "Queue input files", "", "SIMPSON input (*.in);;All files (*.*)")
+        for path in paths:
+            self.submit_job(path)
+
+    # process Parameter sweep action
+    def process_sweep(self):
+        # every sweep point runs in its own subdirectory of the input directory (outputs with fixed names
+        # do not collide), files referenced by the input are copied there so relative paths stay valid
+        if self.input_file_name is None:
+            self.dialog_critical("Save the input file first, sweep inputs are written to its directory")
+            return
+        params, ok = SweepDialog.getSweep(self)
+        if not ok or not params:
+            return
+        script = self.editor.toPlainText()
+        for name, values in params:
+            if substitute_parameter(script, name, values[0]) is None:
+                self.dialog_critical("Parameter %s not found in the input (par block or set command)" % name)
+                return
+        workdir, inputfile = os.path.split(self.input_file_name)
+        rootname = os.path.splitext(inputfile)[0]
+        names = [name for name, values in params]
+        try:
+            files = [path for path in simpson_local_input_files(script, workdir, inputfile) if path != os.path.normpath(self.input_file_name)]
+            # every sweep has its own directory, jobs of a previous sweep may still be running
+            sweepdir = tempfile.mkdtemp(prefix=rootname+"_sweep", dir=workdir)
+        except Exception as e:
+            self.dialog_critical(str(e))
+            return
+        for i, values in enumerate(itertools.product(*[values for name, values in params])):
+            text = script
+            for name, value in zip(names, values):
+                text = substitute_parameter(text, name, value)
+            pointinput = "%s_sweep%d.in" % (rootname, i+1)
+            try:
+                copy_simpson_input(workdir, files, os.path.join(sweepdir, "point%d" % (i+1)), pointinput, text)
+            except Exception as e:
+                self.dialog_critical(str(e))
+                return
+            filename = os.path.join(sweepdir, "point%d" % (i+1), pointinput)
+            self.submit_job(filename, label=", ".join("%s=%s" % nv for nv in zip(names, values)), on_state=self.handle_sweep_job)
+
+    # process Parallel run action
+    def process_run_parallel(self, checked=False, verify=False):
+        print("Triggered Parallel run action")
+        if not self.check_file_is_saved("Run SIMPSON calculation"):
+            return
+        if self.input_file_name is None:
+            self.dialog_critical("There is no proper input file")
+            return
+        chunks, ok = QInputDialog.getInt(self, "Parallel run", "Number of processes:", os.cpu_count() or 1, 1, 1024)
+        if not ok:
+            return
+        run = ParallelRun(self.input_file_name)
+        try:
+            inputs = run.prepare(chunks, verify)
+        except (OSError, ValueError) as e:
+            self.dialog_critical("Parallel run: "+str(e))
+            return
+        for filename in inputs:
+            run.jobs.append(self.submit_job(filename, show_results=False, on_state=lambda job, run=run: self.handle_parallel_job(run, job)))
+        if verify:
+            run.reference = run.jobs.pop()
+        run.submitted = True
+
+    # process Parallel run and verify action
+    def process_run_parallel_verify(self):
+        self.process_run_parallel(verify=True)
+
+    # when all jobs of parallel run are done, results are summed and shown
+    def handle_parallel_job(self, run, job):
+        if not run.submitted:
+            return
+        jobs = run.jobs if run.reference is None else run.jobs+[run.reference]
+        if any(j.state in ("queued", "running") for j in jobs):
+            return
+        if not all(j.state == "finished" for j in jobs):
+            self.report_load_error(run.inputfile, "parallel run failed, partial results kept in "+run.partdir)
+            return
+        try:
+            names, deviations = run.merge()
+        except (OSError, ValueError, KeyError) as e:
+            self.report_load_error(run.inputfile, "merging parallel run failed: "+str(e)+", partial results kept in "+run.partdir)
+            return
+        if run.reference is not None:
+            for name, deviation in zip(names, deviations):
+                message = "Parallel run of %s, %s: relative deviation from single-process run %.3g\n" % (run.inputfile, name, deviation)
+                if deviation > 1e-5:
+                    self.report_load_error(name, message)
+                else:
+                    self.simpson_output_append(message)
+                self.statusBar().showMessage(message.strip())
+        run.cleanup()
+        self.load_fidspe([os.path.join(run.workdir, name) for name in names])
+
+    # finished sweep job: show its results if it did not name them on simview line
+    def handle_sweep_job(self, job):
+        if job.state in ("queued", "running"):
+            return
+        if job.state == "finished" and not job.simview_loaded:
+            rootname = os.path.splitext(job.inputfile)[0]
+            names = sorted(glob.glob(os.path.join(job.workdir, rootname+".fid")) + glob.glob(os.path.join(job.workdir, rootname+".spe")))
+            self.handle_job_simview(job, names)
+
+    def handle_job_simview(self, job, fullnames):
+        job.simview_loaded = True
+        if job.label is not None:
+            for filename in fullnames:
+                label = job.label if len(fullnames) == 1 else job.label+" "+os.path.basename(filename)
+                self.fidspe_labels[os.path.abspath(filename)] = label
+        self.load_fidspe(fullnames)
+
+    # on_state is called when job state changes, results named on simview lines are shown if show_results
+    def submit_job(self, inputfilename, label=None, force=False, show_results=True, on_state=None):
+        job = SimpsonJob(inputfilename, label, self.result_cache, force)
+        if show_results:
+            job.simview.connect(self.handle_job_simview)
+        if on_state is not None:
+            job.stateChanged.connect(on_state)
+        job.stateChanged.connect(self.update_job_tab)
+        self.job_of_console[job.console] = job
+        self.outputtabs.addTab(job.console, "")
+        self.outputtabs.setCurrentWidget(job.console)
+        self.update_job_tab(job)
+        self.job_scheduler.submit(job)
+        return job
+
+    def update_job_tab(self, job):
+        index = self.outputtabs.indexOf(job.console)
+        if index < 0:
+            return
+        if job.state in ("queued", "running"):
+            self.outputtabs.setTabText(index, "%s (%s)" % (job.inputfile, job.state))
+        else:
+            self.outputtabs.setTabText(index, job.inputfile)
+        if job.state == "crashed":
+            self.outputtabs.tabBar().setTabTextColor(index, Qt.red)
+
+    def update_job_status(self):
+        running = len(self.job_scheduler.running)
+        queued = len(self.job_scheduler.queued)
+        if running + queued == 0:
+            self.job_status.setText("")
         else:
-            # indicate running process
-            self.dialog_critical("Can not run, calculation in progress.")
+            self.job_status.setText("SIMPSON: %d running, %d queued " % (running, queued))
+
+    # closing output tab of a calculation in progress kills it
+    def close_output_tab(self, index):
+        console = self.outputtabs.widget(index)
+        job = self.job_of_console.pop(console, None)
+        if job is None:
+            return
+        self.outputtabs.removeTab(index)
+        # running job writes to its console until it ends, the console is deleted then
+        if job.state in ("queued", "running"):
+            job.stateChanged.connect(self.delete_job_console)
+            self.job_scheduler.kill(job)
+        else:
+            self.delete_job_console(job)
+
+    def delete_job_console(self, job):
+        if job.state in ("queued", "running"):
+            return
+        job.console.flushTimer.stop()
+        job.console.deleteLater()
+
+    # calculation shown in output window
+    def current_job(self):
+        return self.job_of_console.get(self.outputtabs.currentWidget())
 
     # process Clear output action        
     def process_clearoutput(self):
         # print("Triggered Clear output action")
-        self.simpsonoutput.clear()
+        self.outputtabs.currentWidget().clear()
 
     # process Kill action        
     def process_kill(self):
         print("Triggered Kill action")
-        print(self.simpson_process.state())
-        if self.simpson_process is not None:
-            self.simpson_process.kill() 
+        job = self.current_job()
+        if job is not None:
+            self.job_scheduler.kill(job)
             print("killing")
 
     def simpson_output_append(self, text):
-        #self.simpsonoutput.appendPlainText(text)  # adds extra end-of-line (inserts a paragraph)
-        # scrollbar moves only if it is at maximum position (allows scrolling back and not moving focus when appending output)
-        scrlbar = self.simpsonoutput.verticalScrollBar()
-        move_scroll = ( scrlbar.value() == scrlbar.maximum() )
-        self.simpsonoutput.insertPlainText(text)  # by itself, it does not handle scrollbar...
-        if move_scroll:
-            scrlbar.setValue(scrlbar.maximum())
-     
-    def handle_simpson_errorOccured(self, error):
-        print("Error Occured:")
-        print(error)
+        # text is shown with current character format of the output window
+        self.simpsonoutput.append_text(text)
 
-    def handle_simpson_stderr(self):
-        # get process stderr and decode it to text
-        data = self.simpson_process.readAllStandardError()
-        stderr = bytes(data).decode("utf8")
-        # remember default character format
-        usual_charformat = self.simpsonoutput.currentCharFormat()
-        # define new character format - errors in red
-        charformat = QTextCharFormat()
-        charformat.setForeground(Qt.red)
-        self.simpsonoutput.setCurrentCharFormat(charformat)
-        # output
-        self.simpson_output_append(stderr)
-        # change back to default character format
-        self.simpsonoutput.setCurrentCharFormat(usual_charformat)
 
-    def handle_simpson_stdout(self):
-        data = self.simpson_process.readAllStandardOutput()
-        #print("stdout using str: "+str(data))
-        stdout = bytes(data).decode(LOCALE_ENCODING)
-        self.simpson_output_append(stdout)
-
-    def handle_simpson_finished(self):
-        print("Exit code:" , self.simpson_process.exitCode())
-        print("Exit status:", self.simpson_process.exitStatus())
-        usual_charformat = self.simpsonoutput.currentCharFormat()
-        charformat = QTextCharFormat()
-        charformat.setFontWeight(QFont.Bold)
-        charformat.setFontItalic(True)
-        errorstatus = (self.simpson_process.exitStatus() == QProcess.CrashExit) or ( (self.simpson_process.exitStatus() == QProcess.NormalExit) and (self.simpson_process.exitCode() != 0) )
-        if errorstatus:
-            charformat.setForeground(Qt.red)
-            self.simpsonoutput.setCurrentCharFormat(charformat)
-            self.simpson_output_append("Process crashed!\n\n")
-        else:
-            self.simpsonoutput.setCurrentCharFormat(charformat)
-            self.simpson_output_append("Process finished.\n\n")
-        self.simpsonoutput.setCurrentCharFormat(usual_charformat)
-        self.simpsonoutput.setStyleSheet("background-color: rgb(255, 255, 255)")
-        workdir = self.simpson_process.workingDirectory()
-        #print(workdir)
-        self.simpson_process = None
-        # extract fidspe filename
-        if not errorstatus:
-            fulloutput = self.simpsonoutput.toPlainText()
-            for textline in reversed(fulloutput.splitlines()):
-                if textline.startswith("simview:"):
-                    # remove the initial keyword and split into list of filenames
-                    names = textline[len("simview:"):].strip()
-                    #print(names)
-                    for filename in names.split(' '):
-                        fullname = os.path.join(workdir,filename)
-                        #print(fullname)
-                        self.load_fidspe(fullname)
-                    break
+    # Examples menu from list of file names, None means the examples path was not searched yet
+    def populate_examples_menu(self):
+        self.examples_menu.clear()
+        for examplefile in self.examples or []:
+            examples_action = QAction(examplefile, self)
+            examples_action.setStatusTip("Load selected Example file")
+            examples_action.triggered.connect(self.example_item_triggered)
+            self.examples_menu.addAction(examples_action)
+        if not self.examples:
+            empty_action = QAction("Searching examples ..." if self.examples is None else "No examples found", self)
+            empty_action.setEnabled(False)
+            self.examples_menu.addAction(empty_action)
 
+    def handle_examples_listed(self, names):
+        if names != self.examples:
+            self.examples = names
+            self.populate_examples_menu()
 
     # example
     def example_item_triggered(self):
@@ -626,13 +911,14 @@ class MainWindow(QMainWindow):
     # Clear selected line
     def clear_selected(self):
         # print("Triggered Clear Selected")
-        if self.canvas.selected_line is not None:
+        if self.canvas is not None and self.canvas.selected_line is not None:
             self.canvas.delete_simpson_data(self.canvas.selected_line)
 
     # Clear all lines
     def clear_all(self):
         # print("Triggered Clear All")
-        self.canvas.delete_all_simpson_data()
+        if self.canvas is not None:
+            self.canvas.delete_all_simpson_data()
         
     def file_load_wave(self):
         print("file_load_wave")
@@ -642,6 +928,7 @@ class MainWindow(QMainWindow):
         userdata = {'scale':1.0,'cplx_data': y1, 'show':"Real"}
         y1 = np.real(y1)
         lbl = "%.3f" % frq
+        self.create_canvas()
         # N E E D  to handle data type FID or SPE here
         self.canvas.simpson_data_type = 'SPE'
         self.canvas.add_simpson_data(t,y1,lbl,userdata)
@@ -655,12 +942,158 @@ class MainWindow(QMainWindow):
             filename = path
         else:
             return
-        self.load_fidspe(filename)
-        
-    def load_fidspe(self, filename):
-        xx, cplx, datatype = load_simpson_fidspe(filename)
+        self.load_fidspe([filename])
+
+    # load FID/SPE files in background threads, lines are added to chart as each file finishes
+    def load_fidspe(self, filenames):
+        for filename in filenames:
+            task = FidSpeLoadTask(filename, self.fidspe_cache, self.load_generation, self.load_signals)
+            self.loads_pending += 1
+            self.loads_total += 1
+            self.load_pool.start(task)
+        self.update_load_progress()
+
+    def update_load_progress(self):
+        if self.loads_pending == 0:
+            self.loads_total = 0
+            self.load_progress.hide()
+            self.load_cancel.hide()
+        else:
+            self.load_progress.setMaximum(self.loads_total)
+            self.load_progress.setValue(self.loads_total-self.loads_pending)
+            self.load_progress.setFormat("Loading %v/%m")
+            self.load_progress.show()
+            self.load_cancel.show()
+
+    def file_load_fidspe_many(self):
+        paths, _ = QFileDialog.getOpenFileNames(self, "Import many FID/SPE", "","SIMPSON output (*.fid *.spe);;All files (*.*)")
+        if paths:
+            self.import_fidspe(paths)
+
+    def file_load_fidspe_directory(self):
+        path = QFileDialog.getExistingDirectory(self, "Import directory")
+        if not path:
+            return
+        paths = sorted(glob.glob(os.path.join(path,"*.fid")) + glob.glob(os.path.join(path,"*.spe")))
+        if paths:
+            self.import_fidspe(paths)
+        else:
+            self.dialog_critical("No FID/SPE files found in "+path)
+
+    # parse many files in parallel processes, lines are added to the chart together when all are done
+    def import_fidspe(self, filenames):
+        if self.import_futures:
+            self.dialog_critical("Can not import, previous import in progress.")
+            return
+        if self.import_executor is None:
+            # forked child of a process running threads (FID/SPE loaders, examples scan) may deadlock, spawn it
+            self.import_executor = concurrent.futures.ProcessPoolExecutor(max_workers=os.cpu_count(), mp_context=multiprocessing.get_context("spawn"))
+        cache = self.fidspe_cache
+        generation = self.load_generation
+        for filename in filenames:
+            future = self.import_executor.submit(import_simpson_fidspe, filename, cache.path, FIDSPE_CACHE_SIZE_MB)
+            # callback runs in a thread of the executor, signal passes the result to GUI thread
+            future.add_done_callback(lambda f, fn=filename: self.emit_fidspe_imported(f, fn, generation))
+            self.import_futures.append(future)
+            self.import_remaining += 1
+            self.loads_pending += 1
+            self.loads_total += 1
+        self.update_load_progress()
+
+    def emit_fidspe_imported(self, future, filename, generation):
+        if future.cancelled():
+            return
+        try:
+            result = future.result()
+        except Exception as e:
+            self.load_signals.imported.emit(generation, filename, None, str(e))
+        else:
+            self.load_signals.imported.emit(generation, filename, result, "")
+
+    # collect results of bulk import, when all files are parsed add them keeping FID and SPE data apart
+    def handle_fidspe_imported(self, generation, filename, result, message):
+        if generation != self.load_generation:
+            return
+        self.loads_pending -= 1
+        self.update_load_progress()
+        if result is None:
+            self.report_load_error(filename, message)
+        else:
+            self.import_results.append((filename, result))
+        self.import_remaining -= 1
+        if self.import_remaining > 0:
+            return
+        results = sorted(self.import_results, key=lambda r: r[0])
+        self.import_futures = []
+        self.import_results = []
+        skipped = []
+        items = []
+        self.create_canvas()
+        for filename, (xx, cplx, datatype) in results:
+            if self.canvas.simpson_data_type is None:
+                self.canvas.simpson_data_type = datatype
+            if self.canvas.simpson_data_type != datatype:
+                skipped.append(os.path.basename(filename))
+                continue
+            userdata = {'scale':1.0,'cplx_data': cplx, 'show':"Real", 'path': os.path.abspath(filename)}
+            lbl = self.fidspe_labels.get(userdata['path'], os.path.basename(filename))
+            items.append((xx,np.real(cplx),lbl,userdata))
+        self.canvas.add_simpson_data_many(items)
+        if skipped:
+            self.dialog_critical("Can't display FID and SPE together, skipped:\n"+"\n".join(skipped))
+
+    # stop waiting for running loads, queued ones are not started at all
+    def cancel_fidspe_loading(self):
+        self.load_pool.clear()
+        for future in self.import_futures:
+            future.cancel()
+        self.import_futures = []
+        self.import_results = []
+        self.import_remaining = 0
+        # files parsed shortly before cancel are not added either
+        self.loaded_timer.stop()
+        self.loaded_fidspe = []
+        self.load_generation += 1
+        self.loads_pending = 0
+        self.update_load_progress()
+
+    def handle_fidspe_loaded(self, generation, filename, result):
+        if generation != self.load_generation:
+            return
+        self.loads_pending -= 1
+        self.update_load_progress()
+        self.loaded_fidspe.append((filename, result))
+        if not self.loaded_timer.isActive():
+            self.loaded_timer.start()
+
+    def add_loaded_fidspe(self):
+        loaded = self.loaded_fidspe
+        self.loaded_fidspe = []
+        self.create_canvas()
+        with self.canvas.batch_update():
+            for filename, (xx, cplx, datatype) in loaded:
+                self.add_fidspe(filename, xx, cplx, datatype)
+
+    def handle_fidspe_failed(self, generation, filename, message):
+        if generation != self.load_generation:
+            return
+        self.loads_pending -= 1
+        self.update_load_progress()
+        self.report_load_error(filename, message)
+
+    # report the error in output window, do not block remaining loads by a dialog
+    def report_load_error(self, filename, message):
+        usual_charformat = self.simpsonoutput.currentCharFormat()
+        charformat = QTextCharFormat()
+        charformat.setForeground(Qt.red)
+        self.simpsonoutput.setCurrentCharFormat(charformat)
+        self.simpson_output_append("Loading %s failed: %s\n" % (filename, message))
+        self.simpsonoutput.setCurrentCharFormat(usual_charformat)
+
+    def add_fidspe(self, filename, xx, cplx, datatype):
+        path = os.path.abspath(filename)
         yy = np.real(cplx)
-        userdata = {'scale':1.0,'cplx_data': cplx, 'show':"Real"}
+        userdata = {'scale':1.0,'cplx_data': cplx, 'show':"Real", 'path': path}
         # N E E D  to handle data type FID or SPE here
         if self.canvas.simpson_data_type is None:
             self.canvas.simpson_data_type = datatype
@@ -668,80 +1101,202 @@ class MainWindow(QMainWindow):
             if self.canvas.simpson_data_type != datatype:
                 self.dialog_critical("Can't display FID and SPE together, clear the chart first")
                 return
-        lbl = os.path.basename(filename)
+        # file already shown (e.g. rewritten by running calculation) is updated in place
+        for line in self.canvas.get_plotlines():
+            if line.user_data.get('path') == path:
+                self.canvas.update_simpson_data(line, xx, cplx)
+                return
+        lbl = self.fidspe_labels.get(path, os.path.basename(filename))
         self.canvas.add_simpson_data(xx,yy,lbl,userdata)
 
 
 
     def findTextHighlight(self):
+        self.findTimer.stop()
         text = self.findentry.text()
         # print("Find this: '"+text+"'")
-        # print(QRegExp.escape(text))
-        rule = self.highlighter.highlightingRules[-1]
-        if len(text) > 0:
-            # print(rule[0])
-            # print(rule[1])
-            newrule = (QRegExp(QRegExp.escape(text)), rule[1])
+        self.highlighter.set_find_text(text)
+        self.update_find_count()
+
+    def find_text_changed(self, position, removed, added):
+        if self.highlighter.findText and (removed > 0 or added > 0):
+            self.findTimer.start()
+
+    # show number of matches, index of the selected one if given
+    def update_find_count(self, index=None):
+        if not self.highlighter.findText:
+            self.findcount.setText("")
+            return
+        n = len(self.highlighter.find_positions())
+        if index is None:
+            self.findcount.setText(" %d found " % n)
+        else:
+            self.findcount.setText(" %d/%d " % (index+1, n))
+
+    def find_next(self):
+        self.find_select(1)
+
+    def find_previous(self):
+        self.find_select(-1)
+
+    # select match following (direction 1) or preceding (direction -1) current selection, wraps around
+    def find_select(self, direction):
+        if self.findTimer.isActive() or self.findentry.text() != self.highlighter.findText:
+            self.findTextHighlight()
+        positions = self.highlighter.find_positions()
+        if len(positions) == 0:
+            return
+        cursor = self.editor.textCursor()
+        if direction > 0:
+            index = bisect.bisect_left(positions, cursor.selectionEnd())
+            if index == len(positions):
+                index = 0
         else:
-            # reset the rule
-            newrule = (None, rule[1])
-        self.highlighter.highlightingRules[-1] = newrule 
-        self.highlighter.rehighlight()
+            index = bisect.bisect_left(positions, cursor.selectionStart()) - 1
+            if index < 0:
+                index = len(positions) - 1
+        cursor.setPosition(positions[index])
+        cursor.setPosition(positions[index] + len(self.highlighter.findText), cursor.KeepAnchor)
+        self.editor.setTextCursor(cursor)
+        self.update_find_count(index)
 
 
 class Highlighter(QSyntaxHighlighter):
     def __init__(self, parent=None):
         super(Highlighter, self).__init__(parent)
 
-        simpkeys, tclkeys = self.load_highlighter_keywords("syntax_highlight_keywords.dat")
-    
-        quotationFormat = QTextCharFormat()
-        quotationFormat.setForeground(Qt.darkGreen)
-        self.highlightingRules = [(QRegExp("\".*\""), quotationFormat)]
-        
-        simpsonKeywordFormat = QTextCharFormat()
-        simpsonKeywordFormat.setForeground(Qt.blue)
-        simpsonKeywordFormat.setFontWeight(QFont.Bold)
-        for key in simpkeys:
-            if len(key) != 0:
-                pattern = "\\b"+key+"\\b"
-                self.highlightingRules.append((QRegExp(pattern), simpsonKeywordFormat))
-
-        tclKeywordFormat = QTextCharFormat()
-        tclKeywordFormat.setForeground(Qt.darkBlue)
-        tclKeywordFormat.setFontWeight(QFont.Bold)
-        for key in tclkeys:
-            if len(key) != 0:
-                pattern = "\\b"+key+"\\b"
-                self.highlightingRules.append((QRegExp(pattern), tclKeywordFormat))
-
-        variablesFormat = QTextCharFormat()
-        variablesFormat.setFontWeight(QFont.Bold)
-        variablesFormat.setForeground(Qt.darkMagenta)
-        self.highlightingRules.append((QRegExp(r"\$\w+"), variablesFormat))
-
-        singleLineCommentFormat = QTextCharFormat()
-        singleLineCommentFormat.setForeground(Qt.red)
-        singleLineCommentFormat.setFontItalic(True)
-        self.highlightingRules.append((QRegExp("#[^\n]*"), singleLineCommentFormat))
-
-        # rule fot matching Find text MUST be the last one
-        findtextFormat = QTextCharFormat()
-        findtextFormat.setBackground(Qt.yellow)
-        self.highlightingRules.append((None, findtextFormat))
+        self.quotationFormat = QTextCharFormat()
+        self.quotationFormat.setForeground(Qt.darkGreen)
+
+        # keywords are looked up by words found in the block, TCL keywords win over SIMPSON ones
+        # keywords that are not a single word (e.g. 'then ') are matched by their own expressions
+        # tables are empty until load_keywords is called after the window is shown
+        self.keywordFormats = {}
+        self.simpsonPhraseRules = []
+        self.tclPhraseRules = []
+        self.simpsonKeywordFormat = QTextCharFormat()
+        self.simpsonKeywordFormat.setForeground(Qt.blue)
+        self.simpsonKeywordFormat.setFontWeight(QFont.Bold)
+
+        self.tclKeywordFormat = QTextCharFormat()
+        self.tclKeywordFormat.setForeground(Qt.darkBlue)
+        self.tclKeywordFormat.setFontWeight(QFont.Bold)
+
+        self.variablesFormat = QTextCharFormat()
+        self.variablesFormat.setFontWeight(QFont.Bold)
+        self.variablesFormat.setForeground(Qt.darkMagenta)
+
+        self.singleLineCommentFormat = QTextCharFormat()
+        self.singleLineCommentFormat.setForeground(Qt.red)
+        self.singleLineCommentFormat.setFontItalic(True)
+
+        # one scan of the block finds comment, variables and words
+        self.tokenExpression = re.compile(r"(#.*)|(\$\w+)|(\w+)")
+
+        # Find text is highlighted over all other formats
+        self.findText = ""
+        self.findPositions = []  # positions of Find text matches in the document
+        self.findIndexValid = True
+        # contentsChanged is emitted also by highlighting, contentsChange tells if characters changed
+        self.document().contentsChange.connect(self.invalidate_find_index)
+        self.findtextFormat = QTextCharFormat()
+        self.findtextFormat.setBackground(Qt.yellow)
+
+        # blocks with numbers only (pulse shapes, crystallite files) have nothing but Find text to highlight
+        self.numericExpression = re.compile(r"[\d\s.,eE+-]*")
+
+        # large documents are highlighted in chunks when the event loop is idle
+        self.deferred = False
+        self.pendingBlock = None
+        self.visibleBlocks = range(0)
+        self.chunkTimer = QTimer()
+        self.chunkTimer.setInterval(0)
+        self.chunkTimer.timeout.connect(self.highlight_chunk)
+
+    # fill keyword tables and highlight the text shown so far again
+    def load_keywords(self):
+        tables = self.load_highlighter_keywords("syntax_highlight_keywords.dat")
+        self.add_keywords(tables['simpson'], self.simpsonKeywordFormat, self.simpsonPhraseRules)
+        self.add_keywords(tables['tcl'], self.tclKeywordFormat, self.tclPhraseRules)
+        if not self.document().isEmpty():
+            self.highlight_progressively(self.document().firstBlock(), 0)
+
+    def add_keywords(self, table, format, phraseRules):
+        for key in table['words']:
+            self.keywordFormats[key] = format
+        for key in table['phrases']:
+            phraseRules.append((re.compile(r"\b"+re.escape(key)+r"\b"), format))
+
+    # only blocks containing matches of the previous or the new Find text are highlighted again
+    def set_find_text(self, text):
+        if text == self.findText:
+            return
+        doc = self.document()
+        blocks = set(doc.findBlock(index).blockNumber() for index in self.find_positions())
+        self.findText = text
+        self.findIndexValid = False
+        blocks.update(doc.findBlock(index).blockNumber() for index in self.find_positions())
+        for number in sorted(blocks):
+            self.rehighlightBlock(doc.findBlockByNumber(number))
+
+    # positions of all matches of Find text, the document is searched again only after it was edited
+    def find_positions(self):
+        if not self.findIndexValid:
+            self.findPositions = []
+            if self.findText:
+                text = self.document().toPlainText()
+                index = text.find(self.findText)
+                while index >= 0:
+                    self.findPositions.append(index)
+                    index = text.find(self.findText, index + len(self.findText))
+            self.findIndexValid = True
+        return self.findPositions
+
+    def invalidate_find_index(self, position, removed, added):
+        if removed > 0 or added > 0:
+            self.findIndexValid = False
+
+    # blocks are not highlighted while deferred, e.g. during setPlainText of a large file
+    @contextlib.contextmanager
+    def deferred_highlighting(self):
+        self.chunkTimer.stop()
+        self.deferred = True
+        try:
+            yield
+        finally:
+            self.deferred = False
+
+    # highlight count blocks starting with first now, the whole document later in chunks
+    def highlight_progressively(self, first, count):
+        self.visibleBlocks = range(first.blockNumber(), first.blockNumber()+count)
+        block = first
+        while block.isValid() and count > 0:
+            self.rehighlightBlock(block)
+            block = block.next()
+            count -= 1
+        self.pendingBlock = 0
+        self.chunkTimer.start()
+
+    def highlight_chunk(self):
+        # keep the editor responsive, work for at most 20 ms
+        deadline = time.perf_counter() + 0.02
+        # block number is kept as blocks may be added or removed by editing meanwhile
+        block = self.document().findBlockByNumber(self.pendingBlock)
+        while block.isValid() and time.perf_counter() < deadline:
+            if block.blockNumber() not in self.visibleBlocks:
+                self.rehighlightBlock(block)
+            block = block.next()
+        if block.isValid():
+            self.pendingBlock = block.blockNumber()
+        else:
+            self.chunkTimer.stop()
+            self.pendingBlock = None
 
     def load_highlighter_keywords(self, filename):
-        # read in file with TCL and simpson keywords
+        # read in file with TCL and simpson keywords, tables split to words and phrases are cached between launches
         try:
-            with open(filename, 'r') as f:
-                # read the file
-                text = f.read()
-                keywords = text.splitlines()
-                tclstart = keywords.index("[TCL_KeyWords]")
-                simpstart = keywords.index("[SIMPSON_KeyWords]")
-                tclkeys = keywords[(tclstart+1):simpstart]
-                simpkeys = keywords[(simpstart+1):]
-                # if some error occured
+            return load_keyword_tables(filename, os.path.join(simview_cache_path(SIMVIEW_CACHE_PATH), "keywords.json"))
+        # if some error occured
         except Exception as e:
             # show error using critical method and use a limited set of keywords
             print("Syntax highlighter:\n===================")
@@ -750,18 +1305,46 @@ class Highlighter(QSyntaxHighlighter):
             simpkeys = ["spinsys", "par", "pulse", "acq", "acq_block", "pulseid", "pulse_shaped", "delay"
                 "fsimpson", "fsave", "simview", "funload", "faddlb", "fft"]
             tclkeys = ["proc", "set", "puts", "source", "global", "expr"]
-        return simpkeys, tclkeys
+        return {'simpson': compile_keywords(simpkeys), 'tcl': compile_keywords(tclkeys)}
 
     def highlightBlock(self, text):
-        for pattern, format in self.highlightingRules:
-            if pattern is None:
-                continue
-            expression = QRegExp(pattern)
-            index = expression.indexIn(text)
-            while index >= 0:
-                length = expression.matchedLength()
-                self.setFormat(index, length, format)
-                index = expression.indexIn(text, index + length)
+        if self.deferred:
+            return
+        if self.numericExpression.fullmatch(text):
+            self.highlight_find_text(text)
+            return
+
+        # string spans from the first to the last quotation mark
+        start = text.find('"')
+        end = text.rfind('"')
+        if start < end:
+            self.setFormat(start, end-start+1, self.quotationFormat)
+
+        for expression, format in self.simpsonPhraseRules:
+            for m in expression.finditer(text):
+                self.setFormat(m.start(), m.end()-m.start(), format)
+        variables = []
+        comment = None
+        for m in self.tokenExpression.finditer(text):
+            if m.lastindex == 3:
+                format = self.keywordFormats.get(m.group())
+                if format is not None:
+                    self.setFormat(m.start(), m.end()-m.start(), format)
+            elif m.lastindex == 2:
+                variables.append(m)
+            else:
+                # comment covers the rest of the block
+                comment = m
+                break
+        for expression, format in self.tclPhraseRules:
+            for m in expression.finditer(text):
+                self.setFormat(m.start(), m.end()-m.start(), format)
+        for m in variables:
+            self.setFormat(m.start(), m.end()-m.start(), self.variablesFormat)
+        if comment is not None:
+            self.setFormat(comment.start(), comment.end()-comment.start(), self.singleLineCommentFormat)
+
+        self.highlight_find_text(text)
 
         # This part of code is related to multiline comments that does not exist in TCL
         # self.setCurrentBlockState(0)
@@ -780,775 +1363,441 @@ class Highlighter(QSyntaxHighlighter):
         #     startIndex = self.commentStartExpression.indexIn(text,
         #             startIndex + commentLength);
 
+    def highlight_find_text(self, text):
+        if self.findText:
+            index = text.find(self.findText)
+            while index >= 0:
+                self.setFormat(index, len(self.findText), self.findtextFormat)
+                index = text.find(self.findText, index + len(self.findText))
+
 
 ### G R A P H I C A L   I N T E R F A C E   P A R T
-class MplCanvas(FigureCanvasQTAgg):
-
-    def __init__(self, parent=None, width=5, height=4, dpi=100):
-        self.fig = Figure(figsize=(width, height), dpi=dpi)
-        self.axes = self.fig.add_subplot(111)
-        #self.axes.tick_params(labelsize=16)
-        super(MplCanvas, self).__init__(self.fig)
-
-        self.mpl_connect('button_press_event', self.mButtonPress)
-        self.mpl_connect('motion_notify_event', self.mMove)
-        self.mpl_connect('button_release_event', self.mButtonRelease)
-        self.mpl_connect('scroll_event', self.mScroll)
-        self.mpl_connect('pick_event', self.legend_pick)
-        # definitions from ssNAKE implementation
-        self.leftMouse = False  # is the left mouse button currently pressed
-        self.panX = None  # start position of dragging the spectrum
-        self.panY = None  # start position of dragging the spectrum
-        self.panAx = None # The ax instance from which dragging was started
-        self.zoomX1 = None  # first corner of the zoombox
-        self.zoomY1 = None  # first corner of the zoombox
-        self.zoomX2 = None  # second corner of the zoombox
-        self.zoomY2 = None  # second corner of the zoombox
-        self.zoomAx = None # The ax instance from which zooming was started
-        self.rect = [None, None, None, None]  # lines for zooming
-        self.rightMouse = False  # is the right mouse button currently pressed
-        # my definitions
-        self.simpson_data_type = None  # whether we display FID or SPE
-        self.legend_handle = None  # points to figure legend, used for checking empty graph
-        self.selected_line = None  # index of the selected line
-        self.defaultXlimits = (0,1)  # limits of full plot
-        self.defaultYlimits = (0,1)  # limits of full plot
-        self.pick_event_lock = False # to handle legend pick and avoid mouseButton actions on axes
-        self.crosshair_cursor = None # to handle active crosshair cursor
-        self.toolcursor = None  # to handle state of Crosshair checkbox
-        self.toolxrev = None # to handle state of x-reverse chexkbox
-
-    def mButtonPress(self, event):
-        # print("canvas mouse event:")
-        # print(event)
-        if self.pick_event_lock:
-            self.pick_event_lock = False;
-            # print("    --> canvas action cancelled")
+class OutputConsole(QPlainTextEdit):
+    """
+    Read-only output window for SIMPSON runs.
+    Text is collected and inserted at most every 100 ms, only the last max_lines lines are kept.
+    """
+    def __init__(self, max_lines, parent=None):
+        super(OutputConsole, self).__init__(parent)
+        self.setReadOnly(True)
+        self.setMaximumBlockCount(max_lines)
+        self.pending = []  # list of [text, character format]
+        self.flushTimer = QTimer()
+        self.flushTimer.setSingleShot(True)
+        self.flushTimer.setInterval(100)
+        self.flushTimer.timeout.connect(self.flush)
+
+    # text is shown with current character format at the time of the call
+    def append_text(self, text, charformat=None):
+        if len(text) == 0:
             return
-        if (event.button == 1) and not event.dblclick :
-            self.leftMouse = True
-            self.zoomX1 = event.xdata
-            self.zoomY1 = event.ydata
-            self.zoomAx = event.inaxes
-        elif event.button == 3:
-            # call context menu when right-click outside axes    
-            if event.inaxes is None:
-                self.figure_context_menu()
-            # Reset axis to default limits when double-click in axes area
-            elif event.dblclick:
-                self.axes.set_xlim(self.defaultXlimits)
-                self.axes.set_ylim(self.defaultYlimits)
-            # first righ-click in axes area prepares for panning
-            else:             
-                self.rightMouse = True
-                self.panX = event.xdata
-                self.panY = event.ydata
-                self.panAx = event.inaxes
-
-    def mMove(self, event):
-        # print("canvas move:")
-        # if event.inaxes is not None:
-        #     print(" inside")
-        # else:
-        #     print("outside")
-        #print(event.inaxes)
-        if self.leftMouse and (self.zoomX1 is not None) and (self.zoomY1 is not None):
-            # draw zooming rectangle
-            inv = self.zoomAx.transData.inverted()      # convert position to axes units in case it is outside
-            point = inv.transform((event.x, event.y))
-            self.zoomX2 = point[0]
-            self.zoomY2 = point[1]
-            if self.rect[0] is not None:
-                try:
-                    if self.rect[0] is not None:
-                        self.rect[0].remove()
-                    if self.rect[1] is not None:
-                        self.rect[1].remove()
-                    if self.rect[2] is not None:
-                        self.rect[2].remove()
-                    if self.rect[3] is not None:
-                        self.rect[3].remove()
-                finally:
-                    self.rect = [None, None, None, None]
-            self.rect[0], = self.zoomAx.plot([self.zoomX1, self.zoomX2], [self.zoomY2, self.zoomY2], 'k', clip_on=False)
-            self.rect[1], = self.zoomAx.plot([self.zoomX1, self.zoomX2], [self.zoomY1, self.zoomY1], 'k', clip_on=False)
-            self.rect[2], = self.zoomAx.plot([self.zoomX1, self.zoomX1], [self.zoomY1, self.zoomY2], 'k', clip_on=False)
-            self.rect[3], = self.zoomAx.plot([self.zoomX2, self.zoomX2], [self.zoomY1, self.zoomY2], 'k', clip_on=False)
-            if event.inaxes is None:
-                # rectangle gets outside the current axes -> enlarge them
-                xlim = self.axes.get_xlim()
-                ylim = self.axes.get_ylim()
-                if (self.toolxrev.isChecked()):
-                    xminlim = max([self.zoomX1, self.zoomX2, xlim[0]])
-                    xmaxlim = min([self.zoomX1, self.zoomX2, xlim[1]])
-                else:
-                    xminlim = min([self.zoomX1, self.zoomX2, xlim[0]])
-                    xmaxlim = max([self.zoomX1, self.zoomX2, xlim[1]])
-                yminlim = min([self.zoomY1, self.zoomY2, ylim[0]])
-                ymaxlim = max([self.zoomY1, self.zoomY2, ylim[1]])
-                self.axes.set_xlim(xminlim, xmaxlim) 
-                self.axes.set_ylim(yminlim, ymaxlim)               
-            self.draw_idle()
-        elif self.rightMouse and self.panX is not None and self.panY is not None:
-            # pan feature
-            inv = self.panAx.transData.inverted()      # convert position to axes units in case it is outside
-            point = inv.transform((event.x, event.y))
-            diffx = self.panX - point[0]
-            diffy = self.panY - point[1]
-            xlim = self.axes.get_xlim()
-            ylim = self.axes.get_ylim()
-            self.axes.set_xlim(xlim[0]+diffx,xlim[1]+diffx)
-            self.axes.set_ylim(ylim[0]+diffy,ylim[1]+diffy)
-            self.draw_idle()
-            
-    def mButtonRelease(self, event):
-        # print("mouse released")
-        # print(event)
-        if event.button == 1:
-            # finish zooming and reset zooming data in self
-            self.leftMouse = False
+        if charformat is None:
+            charformat = self.currentCharFormat()
+        if self.pending and self.pending[-1][1] == charformat:
+            self.pending[-1][0] += text
+        else:
+            self.pending.append([text, charformat])
+        if not self.flushTimer.isActive():
+            self.flushTimer.start()
+
+    def flush(self):
+        self.flushTimer.stop()
+        if not self.pending:
+            return
+        # scrollbar moves only if it is at maximum position (allows scrolling back and not moving focus when appending output)
+        scrlbar = self.verticalScrollBar()
+        move_scroll = ( scrlbar.value() == scrlbar.maximum() )
+        cursor = QTextCursor(self.document())
+        cursor.movePosition(QTextCursor.End)
+        cursor.beginEditBlock()
+        for text, charformat in self.pending:
+            cursor.insertText(text, charformat)
+        cursor.endEditBlock()
+        self.pending = []
+        if move_scroll:
+            scrlbar.setValue(scrlbar.maximum())
+
+    def clear(self):
+        self.flushTimer.stop()
+        self.pending = []
+        super(OutputConsole, self).clear()
+
+
+class SimpsonJob(QObject):
+    """
+    One SIMPSON calculation: its process, output window and state
+    (queued, running, finished, crashed, killed).
+    """
+    stateChanged = pyqtSignal(object)
+    simview = pyqtSignal(object, list)  # job, full names of FID/SPE files to show
+
+    def __init__(self, inputfilename, label=None, cache=None, force=False, parent=None):
+        super(SimpsonJob, self).__init__(parent)
+        self.workdir, self.inputfile = os.path.split(inputfilename)
+        self.label = label  # chart label of the results, e.g. parameter values of a sweep
+        self.simview_loaded = False
+        self.simview_names = []  # files named on simview lines, in order of appearance
+        self.cache = cache
+        self.force = force  # run even if the result is cached
+        self.cache_key = None
+        self.shared_workdir = False  # another job ran in the same directory meanwhile
+        self.console = OutputConsole(OUTPUT_MAX_LINES)
+        self.process = None
+        self.state = "queued"
+        self.killed = False
+
+    def set_state(self, state):
+        self.state = state
+        self.stateChanged.emit(self)
+
+    # environment variables set for SIMPSON
+    def environment(self):
+        return {"TCL_LIBRARY": SIMPSON_TCL_LIBRARY, "LD_LIBRARY_PATH": SIMPSON_LD_LIBRARY_PATH}
+
+    def start(self):
+        self.stdout_decoder = codecs.getincrementaldecoder(LOCALE_ENCODING)(errors="replace")
+        self.stderr_decoder = codecs.getincrementaldecoder("utf8")(errors="replace")
+        self.stdout_line = ""  # incomplete last line of stdout
+        self.log = []  # [stream, text] items kept for the result cache, None if too long
+        self.log_size = 0
+        # decorations
+        self.console.setStyleSheet("background-color: rgb(100, 255, 100)")
+        usual_charformat = self.console.currentCharFormat()
+        charformat = QTextCharFormat()
+        charformat.setFontWeight(QFont.Bold)
+        charformat.setFontItalic(True)
+        self.console.setCurrentCharFormat(charformat)
+        self.console.append_text("Executing %s\n"  %self.inputfile)
+        self.console.setCurrentCharFormat(usual_charformat)
+        self.console.append_text("Directory: %s\n"  %self.workdir)
+        self.set_state("running")
+        if self.cache is not None and self.cache.enabled():
             try:
-                if self.rect[0] is not None:
-                    self.rect[0].remove()
-                if self.rect[1] is not None:
-                    self.rect[1].remove()
-                if self.rect[2] is not None:
-                    self.rect[2].remove()
-                if self.rect[3] is not None:
-                    self.rect[3].remove()
-            finally:
-                self.rect = [None, None, None, None]
-            if self.zoomX2 is not None and self.zoomY2 is not None:                    
-                xminlim = min([self.zoomX1, self.zoomX2])
-                xmaxlim = max([self.zoomX1, self.zoomX2])
-                yminlim = min([self.zoomY1, self.zoomY2])
-                ymaxlim = max([self.zoomY1, self.zoomY2])
-                if (xmaxlim-xminlim>1e-12) and (ymaxlim-yminlim>1e-12):
-                    #self.axes.set_xlim(xminlim, xmaxlim)
-                    if (self.toolxrev.isChecked()): 
-                        self.axes.set_xlim(xmaxlim, xminlim)
-                    else: 
-                        self.axes.set_xlim(xminlim, xmaxlim) 
-                    self.axes.set_ylim(yminlim, ymaxlim)
-            self.zoomX1 = None
-            self.zoomX2 = None
-            self.zoomY1 = None
-            self.zoomY2 = None
-        elif event.button == 3:
-            # stop panning
-            self.rightMouse = False
-        self.draw_idle()
-
-    def mScroll(self, event):
-        if event.inaxes is None:
+                self.cache_key = simpson_run_key(self.workdir, self.inputfile, SIMPSON_EXECUTABLE, self.environment())
+            except OSError as e:
+                print("Result cache: "+str(e))
+        if self.cache_key is not None and not self.force:
+            meta = self.cache.lookup(self.cache_key)
+            if meta is not None:
+                # scheduler is still starting jobs, finish this one after it returns
+                QTimer.singleShot(0, lambda: self.restore_cached(meta))
+                return
+        self.run_process()
+
+    def run_process(self):
+        # output files are recognized by comparing the directory before and after the run
+        self.snapshot = directory_snapshot(self.workdir)
+        # create QProcess instance and connect slots to display output
+        self.process = QProcess()
+        self.process.readyReadStandardOutput.connect(self.handle_stdout)
+        self.process.readyReadStandardError.connect(self.handle_stderr)
+        self.process.finished.connect(self.handle_finished)  # Clean up once complete.
+        self.process.errorOccurred.connect(self.handle_errorOccured)
+        # execute input file
+        self.console.append_text(SIMPSON_EXECUTABLE+" "+self.inputfile+"\n")
+        env = self.process.processEnvironment()
+        for name, value in self.environment().items():
+            env.insert(name, value)
+        self.process.setProcessEnvironment(env)
+        self.process.setWorkingDirectory(self.workdir)
+        self.process.start(SIMPSON_EXECUTABLE, [self.inputfile])
+
+    # output files and log of identical earlier run are used instead of running SIMPSON
+    def restore_cached(self, meta):
+        if self.killed:
+            self.finish("Process killed.\n\n", Qt.red, "killed")
             return
-        scale = 0.9**event.step
-        modifiers = QApplication.keyboardModifiers()
-        if modifiers == Qt.ShiftModifier:
-            # scaling x-axis
-            xlim = self.axes.get_xlim()
-            pos_x = event.xdata
-            xminlim = pos_x - scale*(pos_x-xlim[0])
-            xmaxlim = pos_x + scale*(xlim[1]-pos_x)
-            self.axes.set_xlim(xminlim, xmaxlim)
-        else:
-            if self.selected_line is not None:
-                # scaling selected line data
-                #print("scaling selected line %d by %g" % (self.selected_line, scale) )
-                plotlines =  self.get_plotlines()
-                line = plotlines[self.selected_line]
-                yynew = line.get_ydata()*scale
-                line.user_data['scale'] = line.user_data['scale']*scale
-                line.set_ydata(yynew)
-                # pass line data to snapped cursor to the selected line
-                self.snapped_cursor_update()
-            else:
-                # scaling y-axis
-                ylim = self.axes.get_ylim()
-                pos_y = event.ydata
-                yminlim = pos_y - scale*(pos_y-ylim[0])
-                ymaxlim = pos_y + scale*(ylim[1]-pos_y)
-                self.axes.set_ylim(yminlim, ymaxlim)
-        self.update_legend()
-        self.draw_idle()
-        # print("scrolling:")
-        # print(event.step)
-
-    # pass line data to snapped cursor to the selected line
-    def snapped_cursor_update(self):
-        if (self.crosshair_cursor is not None):
-            if (self.selected_line is None):
-                self.crosshair_cursor.xx = None
-                self.crosshair_cursor.yy = None
-            else: 
-                plotlines = self.get_plotlines()
-                self.crosshair_cursor.xx, self.crosshair_cursor.yy = plotlines[self.selected_line].get_data()
-
-    # add simpson data
-    def add_simpson_data(self, xdata , ydata, datalabel, userdata):
-        # xdata, ydata to display in Chart using plot
-        # datalabel to be displayed in legend
-        if self.legend_handle is None:
-            # this is the first plot
-            newline = self.axes.plot(xdata, ydata, lw=1, label=datalabel)
-            self.axes.relim()
-            self.axes.autoscale()
-            # remember these axes limits
-            self.defaultXlimits = self.axes.get_xlim()
-            self.defaultYlimits = self.axes.get_ylim()
-            if self.simpson_data_type == 'SPE':
-                self.axes.set_xlabel('frequency [Hz]')
-            elif self.simpson_data_type == 'FID':
-                self.axes.set_xlabel('time [ms]')
-        else:
-            # additional lines
-            # remember current axes limits
-            xlims = self.axes.get_xlim()
-            ylims = self.axes.get_ylim()
-            #print("original limits:",xlims,ylims)
-            # plot additional line
-            newline = self.axes.plot(xdata, ydata, lw=1, label=datalabel)
-            # recalculate axes limits and store them as default (should capture all data lines)
-            self.axes.relim()
-            self.axes.autoscale()
-            self.defaultXlimits = self.axes.get_xlim()
-            self.defaultYlimits = self.axes.get_ylim()
-            #print("relim limits:",self.defaultXlimits,self.defaultYlimits)
-            # restore current zoom
-            self.axes.set_xlim(xlims)
-            self.axes.set_ylim(ylims)
-        # update legend and pick properties
-        newline[0].user_data = userdata
-        self.update_legend()
-        self.draw_idle()
-        
-    # delete simpson data from the plot using their plot-line index    
-    def delete_simpson_data(self, idx):
-        # plotlines = self.axes.get_lines()
-        plotlines = self.get_plotlines()
-        if self.selected_line == idx:
-            self.selected_line = None
-            if self.crosshair_cursor is not None:
-                self.crosshair_cursor.xx = None
-                self.crosshair_cursor.yy = None
-        # remember current axes limits
-        xlims = self.axes.get_xlim()
-        ylims = self.axes.get_ylim()
-        plotlines[idx].remove()
-        # recalculate axes limits and store them as default (should capture all data lines)
-        self.axes.relim()
-        self.axes.autoscale()
-        self.defaultXlimits = self.axes.get_xlim()
-        self.defaultYlimits = self.axes.get_ylim()
-        # restore current zoom
-        self.axes.set_xlim(xlims)
-        self.axes.set_ylim(ylims)
-        # redraw
-        self.update_legend()
-        self.draw_idle()
-        
-    def delete_all_simpson_data(self):
-        plotlines = self.get_plotlines()
-        self.selected_line = None
-        if self.crosshair_cursor is not None:
-            self.crosshair_cursor.xx = None
-            self.crosshair_cursor.yy = None
-        for pl in plotlines:
-            pl.remove()
-        self.update_legend()
-        # print("remove all - lims are: ",self.defaultXlimits,self.defaultXlimits)
-        self.axes.set_prop_cycle(None)
-        self.draw_idle()
-        
-        
-    # extract list of lines in current plot except crosshair-cursor lines (without a label)
-    def get_plotlines(self):
-        plotlines =  self.axes.get_lines()
-        # print("get plot lines count = ",len(plotlines))
-        datalines = []
-        for ln in plotlines:
-            # print("line label: ",ln.get_label())
-            if ln.get_label() == '__cursor__':
-                continue
-            datalines.append(ln)
-        return datalines
-        
-    def update_legend(self):
-        #plotlines = self.axes.get_lines()
-        plotlines = self.get_plotlines()
-        # print(" update legend number of plot lines: ",len(plotlines))
-        if len(plotlines) == 0:
-            self.legend_handle.remove()
-            self.legend_handle = None
-            # self.defaultXlimits = (0,1)
-            self.defaultXlimits = (0,1) if not self.toolxrev.isChecked() else (1,0)
-            self.defaultYlimits = (0,1)
-            self.axes.set_xlim(self.defaultXlimits)
-            self.axes.set_ylim(self.defaultYlimits)
-            self.simpson_data_type = None
-            self.axes.set_xlabel('')
+        try:
+            self.cache.restore(self.cache_key, meta, self.workdir)
+        except OSError as e:
+            print("Result cache: "+str(e))
+            self.run_process()
             return
-        legendhandle = self.axes.legend(loc='upper right', fancybox=True, shadow=True)
-        self.legend_handle = legendhandle
-        leglines = legendhandle.get_lines()
-        legtexts = legendhandle.get_texts()
-        # print(" update legend number of legend lines: ",len(leglines))
-        for idx in range(len(plotlines)):
-            # print("legend update idx = ",idx)
-            leglines[idx].set_picker(True) 
-            legtexts[idx].set_picker(True)
-            if plotlines[idx].get_visible() is False:
-                leglines[idx].set_visible(True)
-                leglines[idx].set_alpha(0.2)
-            if idx == self.selected_line:
-                legendlabel = "*"+plotlines[idx].get_label()
+        self.console.append_text("Result restored from cache (Process -> Run without cache executes SIMPSON)\n")
+        for stream, text in meta['log']:
+            if stream == "err":
+                self.append_colored(text, Qt.red)
             else:
-                legendlabel = plotlines[idx].get_label()
-            factor = plotlines[idx].user_data['scale']
-            if abs( factor - 1.0 ) > 0.0001: 
-                legendlabel = legendlabel + f" scl={factor:.2f}"
-            if plotlines[idx].user_data['show'] == "Imag" :
-                legendlabel = legendlabel + " Imag"
-            legtexts[idx].set_text(legendlabel)
-    
-    # handle mouse clicks on legend
-    def legend_pick(self, event):
-        self.pick_event_lock = True
-        # print("legend pick event button: ",event.mouseevent.button)
-        leglines = self.legend_handle.get_lines()
-        plotlines = self.get_plotlines()
-        textlines = self.legend_handle.get_texts()
-        if event.mouseevent.button == 1:
-            # print("  --> left")
-            if isinstance(event.artist, matplotlib.lines.Line2D):
-                # toggle line invisible
-                legendline = event.artist
-                # leglines = self.legend_handle.get_lines()
-                # plotlines = self.axes.get_lines()
-                idx = leglines.index(legendline)
-                visible = not plotlines[idx].get_visible()
-                plotlines[idx].set_visible(visible)
-                legendline.set_alpha(1.0 if visible else 0.2)
-                self.draw_idle()
-            elif isinstance(event.artist, matplotlib.text.Text):
-                # toggle selected line
-                legendtext = event.artist
-                # leglines = self.legend_handle.get_lines()
-                # textlines = self.legend_handle.get_texts()
-                # plotlines = self.axes.get_lines()
-                idx = textlines.index(legendtext)
-                if idx == self.selected_line:
-                    self.selected_line = None
-                    #legendtext.set_text(plotlines[idx].get_label())                    
-                else:
-                    #if self.selected_line is not None:
-                    #    textlines[self.selected_line].set_text(plotlines[self.selected_line].get_label())
-                    self.selected_line = idx
-                    #legendtext.set_text("*"+plotlines[idx].get_label())
-                # print("Text legend number:" + str(idx))
-                # print("     selected :", self.selected_line)
-                # pass line data to snapped cursor to the selected line
-                self.snapped_cursor_update()
-                #if (self.crosshair_cursor is not None):
-                #    if (self.selected_line is None):
-                #        self.crosshair_cursor.xx = None
-                #        self.crosshair_cursor.yy = None
-                #    else: 
-                #        self.crosshair_cursor.xx, self.crosshair_cursor.yy = plotlines[self.selected_line].get_data()
-        elif event.mouseevent.button == 3:
-            # print("  --> right")
-            if isinstance(event.artist, matplotlib.lines.Line2D):
-                # start line editing menu???
-                print("right action on line")
-            elif isinstance(event.artist, matplotlib.text.Text):
-                # delete line
-                # print("right action on text")
-                idx = textlines.index(event.artist)
-                msg = "Delete " + plotlines[idx].get_label() + "?" 
-                # + str(plotlines[idx].user_data['scale'])
-                menu = QMenu()
-                ActDelete = menu.addAction(msg)
-                ActScale = menu.addAction("Set scale")
-                ActReIm = menu.addAction("Toggle Real/Imag")
-                action = menu.exec(QCursor.pos())
-                if action == ActDelete:
-                    # print("Deleting")
-                    self.delete_simpson_data(idx)
-                elif action == ActScale:
-                    # print("manege scale ")
-                    self.set_line_scaling(idx)
-                elif action == ActReIm:
-                    self.toggle_reim(idx)
-                else:
-                    # print("canceling")
-                    pass
-        self.update_legend()
-    
-    # set scaling of individual line in plot
-    def set_line_scaling(self, idx):
-        #print("manege scale of line %d" % idx)
-        plotlines = self.get_plotlines()
-        line = plotlines[idx]
-        yy = line.get_ydata()
-        # remove previous scaling
-        scale1 = line.user_data['scale']
-        yy = yy/scale1
-        # get new scaling factor
-        #scale2, completed = QInputDialog.getDouble(self, 'Line scaling', 'Enter new scaling factor:', scale1)
-        # the line above does the same as the following 7 lines, except here I can set Locale for decimal point (and not decimal comma as for czech locale...)
-        dlg = QInputDialog()
-        dlg.setWindowTitle('Line scaling');
-        dlg.setInputMode(QInputDialog.DoubleInput)
-        dlg.setLabelText('Enter new scaling factor: ')
-        dlg.setDoubleRange(-1e12, 1e12)  # practically unlimited upper bound
-        #spin_box = dlg.findChild(QDoubleSpinBox)
-        #if spin_box:
-        #    spin_box.setDecimals(6)  # allow up to 6 decimal places
-        dlg.setDoubleValue(scale1)
-        dlg.setLocale(QLocale(QLocale.English,QLocale.UnitedKingdom))
-        completed = dlg.exec()
-        # print(completed)
-        if not completed:
-            scale2 = scale1
-        else:
-            scale2 = dlg.doubleValue()
-        # apply new scaling
-        line.user_data['scale'] = scale2
-        yy = yy*scale2
-        line.set_ydata(yy)
-        # pass line data to snapped cursor to the selected line
-        self.snapped_cursor_update()
-        #if (self.crosshair_cursor is not None):
-        #    if (self.selected_line is None):
-        #        self.crosshair_cursor.xx = None
-        #        self.crosshair_cursor.yy = None
-        #    else: 
-        #         self.crosshair_cursor.xx, self.crosshair_cursor.yy = plotlines[self.selected_line].get_data()
-        # update figure
-        self.draw_idle()
-
-    # toggle if line shows real or imaginary part
-    def toggle_reim(self, idx):
-        print("toggle real / imag")
-        items = ["Real", "Imag"]
-        plotlines = self.get_plotlines()
-        line = plotlines[idx]
-        current = line.user_data['show']
-        item, ok = ListSelectionDialog().getItem(self,"Toggle Re/Im","Real or Imag?:", items, current)
-        if ok:
-            print("toggle re /im succsess")
-            if item == "Real":
-                yy = np.real(line.user_data['cplx_data']) * line.user_data['scale']
-                line.user_data['show'] = "Real"
-            else:
-                yy = np.imag(line.user_data['cplx_data']) * line.user_data['scale']
-                line.user_data['show'] = "Imag"
-            line.set_ydata(yy)
-            self.snapped_cursor_update()
-            self.draw_idle()
-    
-    # figure context menu activated by right-click outside axes
-    def figure_context_menu(self):
-        menu = QMenu()
-        export_action = QAction("Export figure", self)
-        export_action.triggered.connect(self.export_figure)
-        menu.addAction(export_action)
-        edit_action = QAction("Edit figure", self)
-        edit_action.triggered.connect(self.edit_figure)
-        menu.addAction(edit_action)
-        crosshair_action = QAction("Crosshair cursor", self)
-        crosshair_action.triggered.connect(self.handle_crosshair_cursor)
-        menu.addAction(crosshair_action)
-        #xrev_action = QAction("Reverse x-axis", self)
-        #xrev_action.triggered.connect(self.handle_xrev)
-        #menu.addAction(xrev_action)
-        menu.exec(QCursor.pos())
-
-    def addToolcursor(self, tc):
-        self.toolcursor = tc
-        
-    def addToolxrev(self, xrev):
-        self.toolxrev = xrev
-        
-    def handle_crosshair_cursor(self):
-        if self.crosshair_cursor is None:
-            # start crusror regime
-            # print("cursor ON")
-            cursor = Cursor(self.axes) # Cursor does mpl_connect during __init__  
-            if (self.selected_line is not None):
-                plotlines = self.get_plotlines()
-                cursor.xx, cursor.yy = plotlines[self.selected_line].get_data()
-            self.crosshair_cursor = cursor
-            self.toolcursor.setChecked(True)
+                self.append_stdout(text)
+        self.handle_simview_line(self.stdout_line)
+        self.finish("Process finished.\n\n", None, "finished")
+
+    # final message and state of the job
+    def finish(self, message, color, state):
+        usual_charformat = self.console.currentCharFormat()
+        charformat = QTextCharFormat()
+        charformat.setFontWeight(QFont.Bold)
+        charformat.setFontItalic(True)
+        if color is not None:
+            charformat.setForeground(color)
+        self.console.setCurrentCharFormat(charformat)
+        self.console.append_text(message)
+        self.console.setCurrentCharFormat(usual_charformat)
+        self.console.setStyleSheet("background-color: rgb(255, 255, 255)")
+        self.set_state(state)
+
+    # remember output for the result cache unless it is too long
+    def record_log(self, stream, text):
+        if self.log is None or len(text) == 0:
+            return
+        self.log_size += len(text)
+        if self.log_size > 10*1024*1024:
+            self.log = None
+        elif self.log and self.log[-1][0] == stream:
+            self.log[-1][1] += text
         else:
-            # cancel cursor regime (destructor of cursor)
-            # print("cursor OFF")
-            # self.crosshair_cursor.horizontal_line.remove()
-            # self.crosshair_cursor.vertical_line.remove()
-            # self.crosshair_cursor.text.remove()
-            # self.mpl_disconnect(self.crosshair_cursor.cid)
-            self.crosshair_cursor.remove_internals()
-            self.crosshair_cursor = None
-            self.toolcursor.setChecked(False)
-        
-    def handle_xrev(self):
-        if (self.toolxrev.isChecked()): 
-            #print("revx not compatible with zoom and other things...")
-            self.axes.xaxis.set_inverted(True)
-            self.defaultXlimits = tuple(sorted(self.defaultXlimits, reverse=True))
+            self.log.append([stream, text])
+
+    def store_result(self):
+        names = simpson_output_files(self.workdir, self.inputfile, self.snapshot, self.simview_names, self.shared_workdir)
+        self.cache.store(self.cache_key, self.workdir, names, self.log)
+
+    def kill(self):
+        self.killed = True
+        if self.process is not None:
+            self.process.kill()
+
+    # job removed from queue before it was started
+    def cancel(self):
+        self.killed = True
+        self.console.append_text("Cancelled.\n")
+        self.set_state("killed")
+
+    def handle_errorOccured(self, error):
+        print("Error Occured:")
+        print(error)
+        # finished signal does not come when the executable can not be started
+        if error == QProcess.FailedToStart:
+            self.append_colored(self.process.errorString()+"\n", Qt.red)
+            self.console.setStyleSheet("background-color: rgb(255, 255, 255)")
+            self.set_state("crashed")
+
+    def append_colored(self, text, color):
+        # remember default character format
+        usual_charformat = self.console.currentCharFormat()
+        charformat = QTextCharFormat()
+        charformat.setForeground(color)
+        self.console.setCurrentCharFormat(charformat)
+        self.console.append_text(text)
+        # change back to default character format
+        self.console.setCurrentCharFormat(usual_charformat)
+
+    def handle_stderr(self):
+        # get process stderr and decode it to text, errors in red
+        data = self.process.readAllStandardError()
+        # multibyte characters may be split between reads, decoder keeps the incomplete ones
+        stderr = self.stderr_decoder.decode(bytes(data))
+        self.record_log("err", stderr)
+        self.append_colored(stderr, Qt.red)
+
+    def handle_stdout(self):
+        data = self.process.readAllStandardOutput()
+        stdout = self.stdout_decoder.decode(bytes(data))
+        self.record_log("out", stdout)
+        self.append_stdout(stdout)
+
+    def append_stdout(self, stdout):
+        self.console.append_text(stdout)
+        # complete lines are searched for simview command, the incomplete one waits for next output
+        text = self.stdout_line + stdout
+        end = text.rfind("\n") + 1
+        self.stdout_line = text[end:]
+        if "simview:" in text[:end]:
+            for textline in text[:end].splitlines():
+                self.handle_simview_line(textline)
+
+    # FID/SPE files named on simview line are shown as soon as the line appears in the output
+    def handle_simview_line(self, textline):
+        if textline.startswith("simview:"):
+            # remove the initial keyword and split into list of filenames
+            names = textline[len("simview:"):].strip()
+            for name in names.split():
+                if name not in self.simview_names:
+                    self.simview_names.append(name)
+            fullnames = [os.path.join(self.workdir,filename) for filename in names.split()]
+            self.simview.emit(self, fullnames)
+
+    def handle_finished(self):
+        print("Exit code:" , self.process.exitCode())
+        print("Exit status:", self.process.exitStatus())
+        # output not read yet and the rest of incomplete characters
+        self.handle_stdout()
+        stdout = self.stdout_decoder.decode(b"", final=True)
+        self.record_log("out", stdout)
+        self.append_stdout(stdout)
+        self.handle_simview_line(self.stdout_line)
+        self.handle_stderr()
+        stderr = self.stderr_decoder.decode(b"", final=True)
+        self.record_log("err", stderr)
+        self.append_colored(stderr, Qt.red)
+        errorstatus = (self.process.exitStatus() == QProcess.CrashExit) or ( (self.process.exitStatus() == QProcess.NormalExit) and (self.process.exitCode() != 0) )
+        self.process = None
+        if self.killed:
+            self.finish("Process killed.\n\n", Qt.red, "killed")
+        elif errorstatus:
+            self.finish("Process crashed!\n\n", Qt.red, "crashed")
         else:
-            self.axes.xaxis.set_inverted(False)
-            self.defaultXlimits = tuple(sorted(self.defaultXlimits))
-        # update figure
-        self.draw_idle()    
-
-    def export_figure(self):
-        print("save figure to file")
-        # ask filename
-        filename, _ = QFileDialog.getSaveFileName(self, "Export figure", "","(*.png *.pdf *.svg  *.eps *.jpg)")
-        # if dialog is cancelled i.e no path is selected
-        if not filename:
-            # return this method, i.e no action performed
-            return
-        # else call save to path method
-        self.fig.savefig(filename)
-        
-    def edit_figure(self):
-        print("edit figure properties not implemented")
+            if self.cache_key is not None and self.log is not None:
+                self.store_result()
+            self.finish("Process finished.\n\n", None, "finished")
 
-class Cursor:
+
+class JobScheduler(QObject):
     """
-    A cross hair cursor.
+    Queue of SIMPSON calculations, at most max_jobs of them run at the same time.
     """
-    def __init__(self, ax):
-        self.ax = ax
-        self.horizontal_line = ax.axhline(color='k', lw=0.8, ls='--', label='__cursor__')
-        self.vertical_line = ax.axvline(color='k', lw=0.8, ls='--', label='__cursor__')
-        # text location in axes coordinates
-        self.text = ax.text(0.02, 0.95, '', transform=ax.transAxes, bbox=dict(facecolor='red', alpha=0.5))
-        # line data used for snapped cursor mode (when a line is selected)
-        self.xx = None
-        self.yy = None
-        self.lastindex = None
-        # distance measurements activated by left click
-        self.position_origin = None
-        # connected action slot ID
-        cid = self.ax.figure.canvas.mpl_connect('motion_notify_event', self.on_mouse_move)
-        self.cid = [cid]
-        cid = self.ax.figure.canvas.mpl_connect('button_press_event', self.on_mouse_button)
-        self.cid.append(cid)
-        # cid = self.ax.figure.canvas.mpl_connect('button_release_event', self.off_mouse_button)
-        # self.cid.append(cid) 
-        self.position_origin_horizontal_line = None
-        self.position_origin_vertical_line = None
-        self.position_delta_text = None
-
-    def remove_internals(self):
-        self.horizontal_line.remove()
-        self.vertical_line.remove()
-        self.text.remove()
-        if self.position_origin_horizontal_line is not None:
-            self.position_origin_horizontal_line.remove()
-            self.position_origin_vertical_line.remove()
-            self.position_delta_text.remove()
-            self.ax.figure.canvas.draw()
-        for cid in self.cid:
-            self.ax.figure.canvas.mpl_disconnect(cid)
-        
-    # def off_mouse_button(self,event):
-    #     print("cursor mouse released: ",event)
-    #     if (event.button == 1) and event.dblclick:
-    #         print("  -- Hught -- ")
-            
-    def on_mouse_button(self, event):
-        if (event.button == 1) and event.dblclick and (event.inaxes is not None):
-            if self.position_origin is None:
-                if (self.lastindex is not None) and (self.xx is not None):
-                    x = self.xx[self.lastindex]
-                    y = self.yy[self.lastindex]
-                else:
-                    x = event.xdata
-                    y = event.ydata
-                self.position_origin = (x, y)
-                self.position_origin_horizontal_line = self.ax.axhline(y=y, color='k', lw=0.8, ls='--', label='__cursor__')
-                self.position_origin_vertical_line = self.ax.axvline(x=x, color='k', lw=0.8, ls='--', label='__cursor__')
-                self.position_delta_text = self.ax.text(x, y, ' dx=0, dy=0', verticalalignment='bottom')
-            else:
-                self.position_origin = None
-                self.position_origin_horizontal_line.remove()
-                self.position_origin_vertical_line.remove()
-                self.position_delta_text.remove()
-                self.position_origin_horizontal_line = None
-                self.position_origin_vertical_line = None
-                self.position_delta_text = None
-                self.ax.figure.canvas.draw()
-            # print(" pos orig: ",self.position_origin)
-        
-        
-    def set_cross_hair_visible(self, visible):
-        need_redraw = self.horizontal_line.get_visible() != visible
-        self.horizontal_line.set_visible(visible)
-        self.vertical_line.set_visible(visible)
-        self.text.set_visible(visible)
-        return need_redraw
-
-    def on_mouse_move(self, event):
-        if not event.inaxes:
-            need_redraw = self.set_cross_hair_visible(False)
-            if need_redraw:
-                self.ax.figure.canvas.draw()
-        else:
-            self.set_cross_hair_visible(True)
-            x, y = event.xdata, event.ydata
-            # update the line positions
-            if self.xx is not None:
-                # snapped version
-                index = min(np.searchsorted(self.xx, x), len(self.xx) - 1)
-                if index == self.lastindex: # do not move the cursor
-                    return
-                self.lastindex = index
-                x = self.xx[index]
-                y = self.yy[index]
-            else:
-                self.lastindex = None
-            # general version
-            self.horizontal_line.set_ydata([y])
-            self.vertical_line.set_xdata([x])
-            if self.position_origin is None:
-                self.text.set_text('x=%1.2f, y=%1.2f' % (x, y))
-            else:
-                dx = x - self.position_origin[0] 
-                dy = y - self.position_origin[1]
-                self.position_delta_text.set_text(' dx=%1.2f, dy=%1.2f' % (dx, dy))
-                self.position_delta_text.set_position((x,y))
-            self.ax.figure.canvas.draw()
+    changed = pyqtSignal()
+
+    def __init__(self, max_jobs, parent=None):
+        super(JobScheduler, self).__init__(parent)
+        self.max_jobs = max_jobs if max_jobs > 0 else (os.cpu_count() or 1)
+        self.queued = []
+        self.running = []
+
+    def submit(self, job):
+        job.stateChanged.connect(self.job_state_changed)
+        self.queued.append(job)
+        self.start_jobs()
+
+    def start_jobs(self):
+        while self.queued and len(self.running) < self.max_jobs:
+            job = self.queued.pop(0)
+            for other in self.running:
+                if other.workdir == job.workdir:
+                    other.shared_workdir = job.shared_workdir = True
+            self.running.append(job)
+            job.start()
+        self.changed.emit()
+
+    def job_state_changed(self, job):
+        if job.state in ("finished", "crashed", "killed") and job in self.running:
+            self.running.remove(job)
+            self.start_jobs()
+
+    def kill(self, job):
+        if job in self.queued:
+            self.queued.remove(job)
+            job.cancel()
+            self.changed.emit()
+        elif job in self.running:
+            job.kill()
+
+    def kill_all(self):
+        for job in list(self.queued):
+            self.kill(job)
+        for job in list(self.running):
+            self.kill(job)
+
 
 ### L O A D I N G   FID / SPE   D A T A   P A R T
-def load_simpson_fidspe(fileName):
-    # ordinary ASCII fid or spe, need to calculate x-coordinate, y is just real part     
-    try:
-        with open(fileName, 'r') as file:
-            # check the first line for SIMP
-            line =  file.readline()
-            line.strip()
-            if line[:-1] != "SIMP":
-                print("Not simpson file:")
-                print(fileName)
-            else:
-                #print("is simp file")
-                pass
-    
-            # read the file
-            info = {}
-            for line in file:
-                line.strip()
-                line = line[:-1]
-                if line == "DATA":
-                    # data start here
-                    break
-                else:
-                    # read header
-                    ll = line.split("=")
-                    #print("Line >"+line+"< is ",ll)
-                    info[ll[0]]=ll[1]
-            #print(info)
-            cplx = []
-            if 'NP' in info:
-                info['NP'] = int(info['NP'])
-            else:
-                print("Error: NP not found")
-            if 'SW' in info:
-                info['SW'] = float(info['SW'])
-            else:
-                print("Error: SW not found")
-            if 'REF' in info:
-                info['REF'] = float(info['REF'])
+# signals of FidSpeLoadTask, the object lives in GUI thread so that slots run there
+class FidSpeLoadSignals(QObject):
+    loaded = pyqtSignal(int, str, object)  # generation, filename, (xx, cplx, datatype)
+    imported = pyqtSignal(int, str, object, str)  # bulk import: generation, filename, result or None, error message
+    failed = pyqtSignal(int, str, str)  # generation, filename, error message
+
+# parse one FID/SPE file in a worker thread of QThreadPool
+class FidSpeLoadTask(QRunnable):
+    def __init__(self, filename, cache, generation, signals):
+        super().__init__()
+        self.filename = filename
+        self.cache = cache
+        self.generation = generation
+        self.signals = signals
+
+    def run(self):
+        try:
+            if self.cache is not None:
+                cplx, info = self.cache.load(self.filename, read_simpson_fidspe)
             else:
-                info['REF'] = 0
-            for i in range(0,info['NP']):
-                line = file.readline()
-                line.strip()
-                line = line[:-1]
-                x,y = [float(i) for i in line.split()]
-                cplx.append(complex(x,y))
-            file.close()            
-    # if some error occured
-    except Exception as e:
-        # show error using critical method
-        #self.dialog_critical(str(e))
-        print(str(e))
-    # else
-    else:
-        # update path value
-        # print("Lines: ",len(text))
-        # for i in range(1,10):
-        #     print("   ",text[i])
-        #print(info)
-        # create x axis
-        if info['TYPE'] == "SPE":
-            corr = info['SW']/2-info['REF']
-            stx = info['SW']/(info['NP']-1)
-        elif info['TYPE'] == "FID":
-            stx = 1.0e3/info['SW']
-            corr = 0
+                cplx, info = read_simpson_fidspe(self.filename)
+            xx = simpson_xaxis(info, len(cplx))
+        except Exception as e:
+            self.signals.failed.emit(self.generation, self.filename, str(e))
         else:
-            print("Error: unknown TYPE ",info['TYPE'])
-        xx = [i*stx-corr for i in range(0,len(cplx))] #this must be repaired  
-        datatype = info['TYPE']
-    return xx, cplx, datatype
-
-# Nice dialog for selection from list, all items visible
-class ListSelectionDialog(QDialog):
-    def __init__(self, parent=None, title="Select Item", question="", items=None, current_item=None):
+            self.signals.loaded.emit(self.generation, self.filename, (xx, cplx, info['TYPE']))
+
+### S T A R T U P   P A R T
+class ExamplesScanSignals(QObject):
+    listed = pyqtSignal(list)  # names of example files
+
+# list examples path in a worker thread, the listing is cached for the next launch
+class ExamplesScanTask(QRunnable):
+    def __init__(self, path, cache_file, signals):
+        super().__init__()
+        self.path = path
+        self.cache_file = cache_file
+        self.signals = signals
+
+    def run(self):
+        names = simpson_example_files(self.path)
+        if names != read_json_cache(self.cache_file, self.path):
+            write_json_cache(self.cache_file, self.path, names)
+        self.signals.listed.emit(names)
+
+### P A R A M E T E R   S W E E P   P A R T
+class SweepDialog(QDialog):
+    def __init__(self, parent=None):
         super().__init__(parent)
-        self.setWindowTitle(title)
-        self.choice = None
-        items = items or []
+        self.setWindowTitle("Parameter sweep")
+        self.params = []
 
         layout = QVBoxLayout()
-        # Optional question label
-        if question:
-            self.label = QLabel(question)
-            self.label.setAlignment(Qt.AlignCenter)
-            layout.addWidget(self.label)
-        # List widget
-        self.list_widget = QListWidget()
-        self.list_widget.addItems(items)
-        layout.addWidget(self.list_widget, alignment=Qt.AlignCenter)
-        # adjust its sizes
-        item_count = self.list_widget.count()
-        height = self.list_widget.sizeHintForRow(0)*item_count + 2*self.list_widget.frameWidth() + 4 # extra padding
-        width = 0
-        for i in range(item_count):
-            item_width = self.list_widget.sizeHintForIndex(self.list_widget.model().index(i, 0)).width()
-            width = max(width, item_width)
-        width = width + 2 * self.list_widget.frameWidth() + 20 # padding + scrollbar space
-        self.list_widget.setFixedSize(width, height) 
-        # Preselect item if specified
-        if current_item and current_item in items:
-            index = items.index(current_item)
-            self.list_widget.setCurrentRow(index)
-        elif items:
-            self.list_widget.setCurrentRow(0)
-        # Push OK button
-        self.ok_button = QPushButton("OK")
+        self.label = QLabel("One parameter per line: name and values, e.g.\n"
+                            "par(spin_rate) 5000:20000:4\n"
+                            "rf 50000, 80000, 100000\n"
+                            "par(...) is changed in par block, other names in their 'set' command.\n"
+                            "All combinations of values are calculated.")
+        layout.addWidget(self.label)
+        self.editor = QPlainTextEdit()
+        self.editor.textChanged.connect(self.update_count)
+        layout.addWidget(self.editor)
+        self.count_label = QLabel()
+        layout.addWidget(self.count_label)
+        # Push Run button
+        self.ok_button = QPushButton("Run")
         self.ok_button.clicked.connect(self.confirm_selection)
         layout.addWidget(self.ok_button, alignment=Qt.AlignCenter)
         # finish the dialog
         self.setLayout(layout)
-        self.setWindowModality(Qt.ApplicationModal)        
+        self.setWindowModality(Qt.ApplicationModal)
+        self.update_count()
+
+    # list of (name, values), raises ValueError for wrong values
+    def parse(self):
+        params = []
+        for textline in self.editor.toPlainText().splitlines():
+            items = textline.split(None, 1)
+            if len(items) == 0:
+                continue
+            if len(items) == 1:
+                raise ValueError("No values for "+items[0])
+            values = parse_sweep_values(items[1])
+            if len(values) == 0:
+                raise ValueError("No values for "+items[0])
+            params.append((items[0], values))
+        return params
+
+    def update_count(self):
+        try:
+            params = self.parse()
+        except ValueError as e:
+            self.count_label.setText(str(e))
+            self.ok_button.setEnabled(False)
+            return
+        count = int(np.prod([len(values) for name, values in params])) if params else 0
+        self.count_label.setText("Calculations: %d" % count)
+        self.ok_button.setEnabled(count > 0)
 
     def confirm_selection(self):
-        item = self.list_widget.currentItem()
-        if item:
-            self.choice = item.text()
+        self.params = self.parse()
         self.accept()  # closes the dialog
 
     @staticmethod
-    def getItem(parent=None, title="Select Item", question="", items=None, current_item=None):
-        dialog = ListSelectionDialog(parent, title, question, items, current_item)
+    def getSweep(parent=None):
+        dialog = SweepDialog(parent)
         result = dialog.exec_()
-        return (dialog.choice, result == QDialog.Accepted)
+        return (dialog.params, result == QDialog.Accepted)
 
 
 # execute the thing
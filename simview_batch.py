@@ -0,0 +1,142 @@
+# -*- coding: utf-8 -*-
+"""
+Command-line batch mode of SIMPSON-view, runs without Qt:
+    python simview.py --batch [--jobs N] [--png] [--pdf] [--npy] [--outdir DIR] [--no-cache] input.in ...
+Every input is executed by SIMPSON_EXECUTABLE (settings at the top of simview.py). FID/SPE files
+named on its simview: lines are written as one chart per input (PNG, PDF) and/or as NumPy
+arrays with columns x, real, imag (one .npy file per FID/SPE file).
+"""
+import sys, os, argparse, subprocess, concurrent.futures
+import numpy as np
+from simview_core import (simview_cache_path, read_simpson_fidspe, simpson_xaxis, ResultCache, simpson_run_key,
+                          directory_snapshot, simpson_output_files)
+
+def parse_arguments(argv):
+    parser = argparse.ArgumentParser(prog="simview.py --batch", description="Run SIMPSON inputs and save their results without GUI.")
+    parser.add_argument("--batch", action="store_true", help=argparse.SUPPRESS)
+    parser.add_argument("inputs", nargs="+", help="SIMPSON input files")
+    parser.add_argument("--jobs", "-j", type=int, default=0, help="number of SIMPSON processes running at the same time (default: SIMPSON_MAX_JOBS, 0 means number of CPU cores)")
+    parser.add_argument("--png", action="store_true", help="save chart of results as PNG")
+    parser.add_argument("--pdf", action="store_true", help="save chart of results as PDF")
+    parser.add_argument("--npy", action="store_true", help="save results as NumPy arrays (x, real, imag)")
+    parser.add_argument("--outdir", default=None, help="directory for charts, data and logs (default: directory of the input)")
+    parser.add_argument("--no-cache", action="store_true", help="run SIMPSON even if the result is cached")
+    return parser.parse_args(argv)
+
+# names of files on simview: lines of SIMPSON output, in order of appearance
+def simview_names(stdout):
+    names = []
+    for textline in stdout.splitlines():
+        if textline.startswith("simview:"):
+            for name in textline[len("simview:"):].split():
+                if name not in names:
+                    names.append(name)
+    return names
+
+# run one input, return (success, log, cached) where log is list of [stream, text]
+def run_input(inputfilename, config, cache=None, force=False, shared_workdir=False):
+    workdir, inputfile = os.path.split(os.path.abspath(inputfilename))
+    environment = {"TCL_LIBRARY": config['SIMPSON_TCL_LIBRARY'], "LD_LIBRARY_PATH": config['SIMPSON_LD_LIBRARY_PATH']}
+    key = None
+    if cache is not None and cache.enabled():
+        try:
+            key = simpson_run_key(workdir, inputfile, config['SIMPSON_EXECUTABLE'], environment)
+        except OSError as e:
+            print("Result cache: "+str(e), file=sys.stderr)
+    if key is not None and not force:
+        meta = cache.lookup(key)
+        if meta is not None:
+            try:
+                cache.restore(key, meta, workdir)
+            except OSError as e:
+                print("Result cache: "+str(e), file=sys.stderr)
+            else:
+                return True, meta['log'], True
+    snapshot = directory_snapshot(workdir)
+    env = dict(os.environ)
+    env.update(environment)
+    try:
+        process = subprocess.run([config['SIMPSON_EXECUTABLE'], inputfile], cwd=workdir, env=env, capture_output=True)
+    except OSError as e:
+        return False, [["err", str(e)+"\n"]], False
+    stdout = process.stdout.decode(config['LOCALE_ENCODING'], errors="replace")
+    stderr = process.stderr.decode("utf8", errors="replace")
+    log = [["out", stdout], ["err", stderr]]
+    success = process.returncode == 0
+    if success and key is not None:
+        names = simpson_output_files(workdir, inputfile, snapshot, simview_names(stdout), shared_workdir)
+        cache.store(key, workdir, names, log)
+    return success, log, False
+
+# chart of all results of one input, real parts as in the GUI
+def save_chart(filenames, results):
+    import matplotlib
+    matplotlib.use('Agg')
+    from matplotlib.figure import Figure
+    from matplotlib.backends.backend_agg import FigureCanvasAgg
+    fig = Figure(figsize=(8, 5))
+    FigureCanvasAgg(fig)
+    axes = fig.add_subplot(111)
+    for name, xx, cplx, datatype in results:
+        axes.plot(xx, np.real(cplx), lw=1, label=name)
+    if results[0][3] == 'SPE':
+        axes.set_xlabel('frequency [Hz]')
+    else:
+        axes.set_xlabel('time [ms]')
+    axes.legend()
+    for filename in filenames:
+        fig.savefig(filename)
+
+# write log, data and charts of finished input, return False if some result is missing
+def save_outputs(inputfilename, log, args):
+    workdir, inputfile = os.path.split(os.path.abspath(inputfilename))
+    outdir = args.outdir if args.outdir else workdir
+    rootname = os.path.join(outdir, os.path.splitext(inputfile)[0])
+    with open(rootname+".log", 'w') as f:
+        for stream, text in log:
+            f.write(text)
+    stdout = "".join(text for stream, text in log if stream == "out")
+    results = []
+    complete = True
+    for name in simview_names(stdout):
+        try:
+            cplx, info = read_simpson_fidspe(os.path.join(workdir, name))
+            xx = simpson_xaxis(info, len(cplx))
+        except Exception as e:
+            print("Loading %s failed: %s" % (name, str(e)), file=sys.stderr)
+            complete = False
+            continue
+        results.append((name, xx, cplx, info['TYPE']))
+        if args.npy:
+            np.save(os.path.join(outdir, name+".npy"), np.column_stack((xx, np.real(cplx), np.imag(cplx))))
+    # FID and SPE are not shown together, the first one decides as in the GUI
+    results = [r for r in results if r[3] == results[0][3]] if results else results
+    charts = [rootname+ext for ext, wanted in ((".png", args.png), (".pdf", args.pdf)) if wanted]
+    if charts and results:
+        save_chart(charts, results)
+    return complete
+
+def main(argv, config):
+    args = parse_arguments(argv)
+    jobs = args.jobs if args.jobs > 0 else config.get('SIMPSON_MAX_JOBS', 0)
+    jobs = jobs if jobs > 0 else (os.cpu_count() or 1)
+    if args.outdir:
+        os.makedirs(args.outdir, exist_ok=True)
+    cache = ResultCache(os.path.join(simview_cache_path(config.get('SIMVIEW_CACHE_PATH', "")), "results"),
+                        config.get('RESULT_CACHE_SIZE_MB', 0), config.get('RESULT_CACHE_MAX_AGE_DAYS', 0))
+    workdirs = [os.path.dirname(os.path.abspath(name)) for name in args.inputs]
+    failed = 0
+    with concurrent.futures.ThreadPoolExecutor(max_workers=jobs) as executor:
+        futures = {}
+        for name, workdir in zip(args.inputs, workdirs):
+            shared = jobs > 1 and workdirs.count(workdir) > 1
+            futures[executor.submit(run_input, name, config, cache, args.no_cache, shared)] = name
+        for done, future in enumerate(concurrent.futures.as_completed(futures)):
+            name = futures[future]
+            success, log, cached = future.result()
+            # log is written also for failed runs
+            success = save_outputs(name, log, args) and success
+            if not success:
+                failed += 1
+            print("[%d/%d] %s %s%s" % (done+1, len(futures), name, "finished" if success else "FAILED", " (cached)" if cached else ""))
+    return 1 if failed else 0
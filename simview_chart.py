@@ -0,0 +1,1046 @@
+# -*- coding: utf-8 -*-
+"""
+Chart part of SIMPSON-view: matplotlib canvas with lines of FID/SPE data and its helpers.
+Kept apart from simview.py so that matplotlib is imported only after the main window is shown.
+"""
+import time, contextlib
+import matplotlib
+matplotlib.use('Qt5Agg')
+from matplotlib.backends.backend_qt5agg import FigureCanvasQTAgg
+from matplotlib.figure import Figure
+from matplotlib.transforms import Affine2D
+import numpy as np
+from PyQt5.QtCore import Qt, QLocale, QTimer
+from PyQt5.QtGui import QCursor
+from PyQt5.QtWidgets import (QApplication, QAction, QMenu, QFileDialog, QInputDialog, QDialog, QVBoxLayout, QLabel,
+                             QListWidget, QPushButton)
+
+class MplCanvas(FigureCanvasQTAgg):
+
+    def __init__(self, parent=None, width=5, height=4, dpi=100, frame_rate=60, fast_pan=True, single_precision=False):
+        self.fig = Figure(figsize=(width, height), dpi=dpi)
+        self.axes = self.fig.add_subplot(111)
+        #self.axes.tick_params(labelsize=16)
+        super(MplCanvas, self).__init__(self.fig)
+
+        # motion and scroll events are merged and applied at most once per frame
+        self.input_scheduler = InputScheduler(frame_rate)
+        self.mpl_connect('button_press_event', self.mButtonPress)
+        self.mpl_connect('motion_notify_event', lambda event: self.input_scheduler.post_motion(self.mMove, event))
+        self.mpl_connect('button_release_event', self.mButtonRelease)
+        self.mpl_connect('scroll_event', lambda event: self.input_scheduler.post_scroll(self.mScroll, event))
+        self.mpl_connect('pick_event', self.legend_pick)
+        self.mpl_connect('resize_event', self.mResize)
+        # definitions from ssNAKE implementation
+        self.leftMouse = False  # is the left mouse button currently pressed
+        self.panX = None  # start position of dragging the spectrum
+        self.panY = None  # start position of dragging the spectrum
+        self.panAx = None # The ax instance from which dragging was started
+        self.zoomX1 = None  # first corner of the zoombox
+        self.zoomY1 = None  # first corner of the zoombox
+        self.zoomX2 = None  # second corner of the zoombox
+        self.zoomY2 = None  # second corner of the zoombox
+        self.zoomAx = None # The ax instance from which zooming was started
+        self.rightMouse = False  # is the right mouse button currently pressed
+        self.panPixel = None  # mouse position (pixels) where the rendered plot was grabbed for fast pan
+        self.panRedrawFraction = 0.25  # fast pan renders the plot when this part of the axes becomes empty
+        self.fast_pan = fast_pan  # shift rendered image while panning, render the plot on mouse release
+        # my definitions
+        self.simpson_data_type = None  # whether we display FID or SPE
+        self.legend_handle = None  # points to figure legend, used for checking empty graph
+        self.selected_line = None  # index of the selected line
+        self.defaultXlimits = (0,1)  # limits of full plot
+        self.defaultYlimits = (0,1)  # limits of full plot
+        self.pick_event_lock = False # to handle legend pick and avoid mouseButton actions on axes
+        self.crosshair_cursor = None # to handle active crosshair cursor
+        self.toolcursor = None  # to handle state of Crosshair checkbox
+        self.toolxrev = None # to handle state of x-reverse chexkbox
+        self.batch_depth = 0  # > 0 inside batch_update
+        self.batch_lines = []  # lines added but not yet committed to the chart
+        self.blit_manager = BlitManager(self)  # fast redraw of crosshair and other animated artists
+        self.line_store = LineStore(single_precision)  # full resolution data of all plotted lines
+        # zooming rectangle, one persistent animated line shown only while dragging
+        self.zoom_rect = matplotlib.lines.Line2D([], [], color='k', lw=1, clip_on=False, visible=False, label='__cursor__')
+        self.axes.add_line(self.zoom_rect)
+        self.blit_manager.add_artist(self.zoom_rect)
+
+    def mButtonPress(self, event):
+        # apply pending moves first, press must see the current state
+        self.input_scheduler.flush()
+        # print("canvas mouse event:")
+        # print(event)
+        if self.pick_event_lock:
+            self.pick_event_lock = False;
+            # print("    --> canvas action cancelled")
+            return
+        if (event.button == 1) and not event.dblclick :
+            self.leftMouse = True
+            self.zoomX1 = event.xdata
+            self.zoomY1 = event.ydata
+            self.zoomAx = event.inaxes
+        elif event.button == 3:
+            # call context menu when right-click outside axes    
+            if event.inaxes is None:
+                self.figure_context_menu()
+            # Reset axis to default limits when double-click in axes area
+            elif event.dblclick:
+                self.axes.set_xlim(self.defaultXlimits)
+                self.axes.set_ylim(self.defaultYlimits)
+                self.update_decimation()
+            # first righ-click in axes area prepares for panning
+            else:             
+                self.rightMouse = True
+                self.panX = event.xdata
+                self.panY = event.ydata
+                self.panAx = event.inaxes
+                self.panPixel = (event.x, event.y)
+
+    def mMove(self, event):
+        # print("canvas move:")
+        # if event.inaxes is not None:
+        #     print(" inside")
+        # else:
+        #     print("outside")
+        #print(event.inaxes)
+        if self.leftMouse and (self.zoomX1 is not None) and (self.zoomY1 is not None):
+            # draw zooming rectangle
+            inv = self.zoomAx.transData.inverted()      # convert position to axes units in case it is outside
+            point = inv.transform((event.x, event.y))
+            self.zoomX2 = point[0]
+            self.zoomY2 = point[1]
+            self.zoom_rect.set_data([self.zoomX1, self.zoomX2, self.zoomX2, self.zoomX1, self.zoomX1],
+                                    [self.zoomY1, self.zoomY1, self.zoomY2, self.zoomY2, self.zoomY1])
+            self.zoom_rect.set_visible(True)
+            if event.inaxes is None:
+                # rectangle gets outside the current axes -> enlarge them
+                xlim = self.axes.get_xlim()
+                ylim = self.axes.get_ylim()
+                if (self.toolxrev.isChecked()):
+                    xminlim = max([self.zoomX1, self.zoomX2, xlim[0]])
+                    xmaxlim = min([self.zoomX1, self.zoomX2, xlim[1]])
+                else:
+                    xminlim = min([self.zoomX1, self.zoomX2, xlim[0]])
+                    xmaxlim = max([self.zoomX1, self.zoomX2, xlim[1]])
+                yminlim = min([self.zoomY1, self.zoomY2, ylim[0]])
+                ymaxlim = max([self.zoomY1, self.zoomY2, ylim[1]])
+                self.axes.set_xlim(xminlim, xmaxlim) 
+                self.axes.set_ylim(yminlim, ymaxlim)               
+                self.update_decimation()
+                self.draw_idle()
+            else:
+                # only the rectangle moved, blit it over the stored figure
+                self.blit_manager.update()
+        elif self.rightMouse and self.panX is not None and self.panY is not None:
+            # pan feature
+            if self.fast_pan and self.blit_manager.background is not None:
+                dx = event.x - self.panPixel[0]
+                dy = event.y - self.panPixel[1]
+                bbox = self.axes.bbox
+                if abs(dx) < self.panRedrawFraction*bbox.width and abs(dy) < self.panRedrawFraction*bbox.height:
+                    # just shift the rendered plot, it is rendered again on button release
+                    self.blit_manager.pan_offset = (dx, dy)
+                    self.blit_manager.update()
+                    return
+                # large part of the plot would be empty, render it now and continue shifting the new image
+                self.blit_manager.pan_offset = None
+                self.panPixel = (event.x, event.y)
+                self.pan_to(event)
+                self.draw()
+            else:
+                self.pan_to(event)
+                self.draw_idle()
+
+    # move axes limits so that the point where panning started is at the mouse position
+    def pan_to(self, event):
+        inv = self.panAx.transData.inverted()      # convert position to axes units in case it is outside
+        point = inv.transform((event.x, event.y))
+        diffx = self.panX - point[0]
+        diffy = self.panY - point[1]
+        xlim = self.axes.get_xlim()
+        ylim = self.axes.get_ylim()
+        self.axes.set_xlim(xlim[0]+diffx,xlim[1]+diffx)
+        self.axes.set_ylim(ylim[0]+diffy,ylim[1]+diffy)
+        self.update_decimation()
+            
+    def mButtonRelease(self, event):
+        self.input_scheduler.flush()
+        # print("mouse released")
+        # print(event)
+        if event.button == 1:
+            # finish zooming and reset zooming data in self
+            self.leftMouse = False
+            self.zoom_rect.set_visible(False)
+            self.zoom_rect.set_data([], [])
+            if self.zoomX2 is not None and self.zoomY2 is not None:                    
+                xminlim = min([self.zoomX1, self.zoomX2])
+                xmaxlim = max([self.zoomX1, self.zoomX2])
+                yminlim = min([self.zoomY1, self.zoomY2])
+                ymaxlim = max([self.zoomY1, self.zoomY2])
+                if (xmaxlim-xminlim>1e-12) and (ymaxlim-yminlim>1e-12):
+                    #self.axes.set_xlim(xminlim, xmaxlim)
+                    if (self.toolxrev.isChecked()): 
+                        self.axes.set_xlim(xmaxlim, xminlim)
+                    else: 
+                        self.axes.set_xlim(xminlim, xmaxlim) 
+                    self.axes.set_ylim(yminlim, ymaxlim)
+                # view changed (also when the rectangle enlarged the axes)
+                self.update_decimation()
+            self.zoomX1 = None
+            self.zoomX2 = None
+            self.zoomY1 = None
+            self.zoomY2 = None
+        elif event.button == 3:
+            # stop panning
+            if self.rightMouse and self.blit_manager.pan_offset is not None:
+                # finish fast pan, the real render follows
+                self.blit_manager.pan_offset = None
+                self.pan_to(event)
+            self.rightMouse = False
+        self.draw_idle()
+
+    def mScroll(self, event):
+        if event.inaxes is None:
+            return
+        scale = 0.9**event.step
+        # event may be merged and delayed, use modifiers and position valid for current limits
+        modifiers = event.qt_modifiers
+        pos_x, pos_y = self.axes.transData.inverted().transform((event.x, event.y))
+        if modifiers == Qt.ShiftModifier:
+            # scaling x-axis
+            xlim = self.axes.get_xlim()
+            xminlim = pos_x - scale*(pos_x-xlim[0])
+            xmaxlim = pos_x + scale*(xlim[1]-pos_x)
+            self.axes.set_xlim(xminlim, xmaxlim)
+            self.update_decimation()
+        else:
+            if self.selected_line is not None:
+                # scaling selected line data
+                #print("scaling selected line %d by %g" % (self.selected_line, scale) )
+                plotlines =  self.get_plotlines()
+                line = plotlines[self.selected_line]
+                self.set_line_scale(line, line.user_data['scale']*scale)
+                self.update_legend_text(self.selected_line)
+            else:
+                # scaling y-axis
+                ylim = self.axes.get_ylim()
+                yminlim = pos_y - scale*(pos_y-ylim[0])
+                ymaxlim = pos_y + scale*(ylim[1]-pos_y)
+                self.axes.set_ylim(yminlim, ymaxlim)
+        self.draw_idle()
+        # print("scrolling:")
+        # print(event.step)
+
+    # pass line data to snapped cursor to the selected line
+    def snapped_cursor_update(self):
+        if (self.crosshair_cursor is not None):
+            if (self.selected_line is None):
+                self.crosshair_cursor.xx = None
+                self.crosshair_cursor.yy = None
+            else: 
+                plotlines = self.get_plotlines()
+                # cursor works with full resolution data
+                user_data = plotlines[self.selected_line].user_data
+                self.crosshair_cursor.xx, self.crosshair_cursor.yy = user_data['xdata'], user_data['ydata']
+                self.crosshair_cursor.yscale = user_data['scale']
+
+    def mResize(self, event):
+        # number of pixels across the axes changed
+        self.update_decimation()
+
+    # replace data of plot lines by min/max envelope of the visible x-range, one bin per pixel
+    def update_decimation(self):
+        for line in self.get_plotlines():
+            self.decimate_line(line)
+
+    def decimate_line(self, line):
+        npixels = max(int(self.axes.bbox.width), 1)
+        xd, yd = minmax_decimate(line.user_data['xdata'], line.user_data['ydata'], self.axes.get_xlim(), npixels)
+        line.set_data(xd, yd)
+
+    # put full resolution data back to plot lines (for autoscaling and export)
+    def show_full_resolution(self):
+        for line in self.get_plotlines():
+            line.set_data(line.user_data['xdata'], line.user_data['ydata'])
+
+    # add simpson data
+    def add_simpson_data(self, xdata , ydata, datalabel, userdata):
+        # xdata, ydata to display in Chart using plot
+        # datalabel to be displayed in legend
+        # full resolution data are kept in line_store, plot line gets decimated data
+        # userdata['cplx_data'] is moved to the store, xdata and ydata in userdata are views of stored arrays
+        # ydata are not scaled, scale factor of the line is applied by its transform
+        self.store_line_data(userdata, xdata, userdata.pop('cplx_data'))
+        newline = self.axes.plot(userdata['xdata'], userdata['ydata'], lw=1, label=datalabel)
+        newline[0].user_data = userdata
+        userdata['scale_transform'] = Affine2D().scale(1.0, userdata['scale'])
+        newline[0].set_transform(userdata['scale_transform'] + self.axes.transData)
+        self.batch_lines.append(newline[0])
+        # inside batch_update the chart is updated once when the batch ends
+        if self.batch_depth == 0:
+            self.commit_simpson_data()
+
+    def store_line_data(self, userdata, xdata, cplx):
+        key = self.line_store.add(cplx, xdata)
+        userdata['store_key'] = key
+        userdata['xdata'] = xdata = self.line_store.xdata(key)
+        userdata['ydata'] = ydata = self.line_store.part(key, userdata['show'])
+        # data bounds are computed once here, default axes limits are derived from them
+        userdata['xbounds'] = (np.nanmin(xdata), np.nanmax(xdata))
+        userdata['ybounds'] = (np.nanmin(ydata), np.nanmax(ydata))
+
+    # replace data of a line already in the chart, its label, scale and Re/Im choice are kept
+    def update_simpson_data(self, line, xdata, cplx):
+        self.line_store.remove(line.user_data['store_key'])
+        self.store_line_data(line.user_data, xdata, cplx)
+        self.update_default_limits()
+        self.decimate_line(line)
+        self.snapped_cursor_update()
+        self.draw_idle()
+
+    # add several lines at once, items are tuples (xdata, ydata, datalabel, userdata)
+    def add_simpson_data_many(self, items):
+        with self.batch_update():
+            for xdata, ydata, datalabel, userdata in items:
+                self.add_simpson_data(xdata, ydata, datalabel, userdata)
+
+    # context manager deferring limits, legend and redraw of added lines until the end of the block
+    @contextlib.contextmanager
+    def batch_update(self):
+        self.batch_depth += 1
+        try:
+            yield
+        finally:
+            self.batch_depth -= 1
+            if self.batch_depth == 0:
+                self.commit_simpson_data()
+
+    # update chart after lines were added
+    def commit_simpson_data(self):
+        newlines = self.batch_lines
+        self.batch_lines = []
+        if len(newlines) == 0:
+            return
+        # recalculate default axes limits (should capture all data lines)
+        self.update_default_limits()
+        if self.legend_handle is None:
+            # these are the first plots, show all data
+            self.axes.set_xlim(self.defaultXlimits)
+            self.axes.set_ylim(self.defaultYlimits)
+            if self.simpson_data_type == 'SPE':
+                self.axes.set_xlabel('frequency [Hz]')
+            elif self.simpson_data_type == 'FID':
+                self.axes.set_xlabel('time [ms]')
+        # additional lines keep current zoom
+        for line in newlines:
+            self.decimate_line(line)
+        # update legend and pick properties
+        self.update_legend()
+        self.draw_idle()
+        
+    # default axes limits cover data bounds of all lines with margins as matplotlib autoscale
+    def update_default_limits(self):
+        plotlines = self.get_plotlines()
+        if len(plotlines) == 0:
+            return
+        xmin = min(line.user_data['xbounds'][0] for line in plotlines)
+        xmax = max(line.user_data['xbounds'][1] for line in plotlines)
+        ybounds = [line.user_data['scale']*np.array(line.user_data['ybounds']) for line in plotlines]
+        ymin = min(b.min() for b in ybounds)
+        ymax = max(b.max() for b in ybounds)
+        xmin, xmax = expand_singular(xmin, xmax)
+        ymin, ymax = expand_singular(ymin, ymax)
+        dx = (xmax - xmin)*matplotlib.rcParams['axes.xmargin']
+        dy = (ymax - ymin)*matplotlib.rcParams['axes.ymargin']
+        if self.axes.xaxis_inverted():
+            self.defaultXlimits = (xmax+dx, xmin-dx)
+        else:
+            self.defaultXlimits = (xmin-dx, xmax+dx)
+        self.defaultYlimits = (ymin-dy, ymax+dy)
+
+    # change scale factor of line, only its transform is changed (data are not copied)
+    def set_line_scale(self, line, scale):
+        line.user_data['scale'] = scale
+        line.user_data['scale_transform'].clear().scale(1.0, scale)
+        line.stale = True
+        self.update_default_limits()
+        # pass line data to snapped cursor to the selected line
+        self.snapped_cursor_update()
+
+    # delete simpson data from the plot using their plot-line index    
+    def delete_simpson_data(self, idx):
+        # plotlines = self.axes.get_lines()
+        plotlines = self.get_plotlines()
+        if self.selected_line == idx:
+            self.selected_line = None
+            if self.crosshair_cursor is not None:
+                self.crosshair_cursor.xx = None
+                self.crosshair_cursor.yy = None
+        self.line_store.remove(plotlines[idx].user_data['store_key'])
+        plotlines[idx].remove()
+        # recalculate default axes limits (should capture all data lines), current zoom is kept
+        self.update_default_limits()
+        # redraw
+        self.update_legend()
+        self.draw_idle()
+        
+    def delete_all_simpson_data(self):
+        plotlines = self.get_plotlines()
+        self.selected_line = None
+        if self.crosshair_cursor is not None:
+            self.crosshair_cursor.xx = None
+            self.crosshair_cursor.yy = None
+        for pl in plotlines:
+            self.line_store.remove(pl.user_data['store_key'])
+            pl.remove()
+        self.update_legend()
+        # print("remove all - lims are: ",self.defaultXlimits,self.defaultXlimits)
+        self.axes.set_prop_cycle(None)
+        self.draw_idle()
+        
+        
+    # extract list of lines in current plot except crosshair-cursor lines (without a label)
+    def get_plotlines(self):
+        plotlines =  self.axes.get_lines()
+        # print("get plot lines count = ",len(plotlines))
+        datalines = []
+        for ln in plotlines:
+            # print("line label: ",ln.get_label())
+            if ln.get_label() == '__cursor__':
+                continue
+            datalines.append(ln)
+        return datalines
+        
+    def update_legend(self):
+        #plotlines = self.axes.get_lines()
+        plotlines = self.get_plotlines()
+        # print(" update legend number of plot lines: ",len(plotlines))
+        if len(plotlines) == 0:
+            self.legend_handle.remove()
+            self.legend_handle = None
+            # self.defaultXlimits = (0,1)
+            self.defaultXlimits = (0,1) if not self.toolxrev.isChecked() else (1,0)
+            self.defaultYlimits = (0,1)
+            self.axes.set_xlim(self.defaultXlimits)
+            self.axes.set_ylim(self.defaultYlimits)
+            self.simpson_data_type = None
+            self.axes.set_xlabel('')
+            return
+        legendhandle = self.axes.legend(loc='upper right', fancybox=True, shadow=True)
+        self.legend_handle = legendhandle
+        leglines = legendhandle.get_lines()
+        legtexts = legendhandle.get_texts()
+        # print(" update legend number of legend lines: ",len(leglines))
+        for idx in range(len(plotlines)):
+            # print("legend update idx = ",idx)
+            leglines[idx].set_picker(True) 
+            legtexts[idx].set_picker(True)
+            if plotlines[idx].get_visible() is False:
+                leglines[idx].set_visible(True)
+                leglines[idx].set_alpha(0.2)
+            legtexts[idx].set_text(self.legend_label(idx, plotlines[idx]))
+
+    # legend text of a line: selection mark, label, scale factor and shown part
+    def legend_label(self, idx, line):
+        if idx == self.selected_line:
+            legendlabel = "*"+line.get_label()
+        else:
+            legendlabel = line.get_label()
+        factor = line.user_data['scale']
+        if abs( factor - 1.0 ) > 0.0001: 
+            legendlabel = legendlabel + f" scl={factor:.2f}"
+        if line.user_data['show'] == "Imag" :
+            legendlabel = legendlabel + " Imag"
+        return legendlabel
+
+    # update legend text of one line without rebuilding the legend
+    def update_legend_text(self, idx):
+        if self.legend_handle is None:
+            return
+        line = self.get_plotlines()[idx]
+        self.legend_handle.get_texts()[idx].set_text(self.legend_label(idx, line))
+    
+    # handle mouse clicks on legend
+    def legend_pick(self, event):
+        self.pick_event_lock = True
+        # print("legend pick event button: ",event.mouseevent.button)
+        leglines = self.legend_handle.get_lines()
+        plotlines = self.get_plotlines()
+        textlines = self.legend_handle.get_texts()
+        if event.mouseevent.button == 1:
+            # print("  --> left")
+            if isinstance(event.artist, matplotlib.lines.Line2D):
+                # toggle line invisible
+                legendline = event.artist
+                # leglines = self.legend_handle.get_lines()
+                # plotlines = self.axes.get_lines()
+                idx = leglines.index(legendline)
+                visible = not plotlines[idx].get_visible()
+                plotlines[idx].set_visible(visible)
+                legendline.set_alpha(1.0 if visible else 0.2)
+                self.draw_idle()
+            elif isinstance(event.artist, matplotlib.text.Text):
+                # toggle selected line
+                legendtext = event.artist
+                # leglines = self.legend_handle.get_lines()
+                # textlines = self.legend_handle.get_texts()
+                # plotlines = self.axes.get_lines()
+                idx = textlines.index(legendtext)
+                if idx == self.selected_line:
+                    self.selected_line = None
+                    #legendtext.set_text(plotlines[idx].get_label())                    
+                else:
+                    #if self.selected_line is not None:
+                    #    textlines[self.selected_line].set_text(plotlines[self.selected_line].get_label())
+                    self.selected_line = idx
+                    #legendtext.set_text("*"+plotlines[idx].get_label())
+                # print("Text legend number:" + str(idx))
+                # print("     selected :", self.selected_line)
+                # pass line data to snapped cursor to the selected line
+                self.snapped_cursor_update()
+                #if (self.crosshair_cursor is not None):
+                #    if (self.selected_line is None):
+                #        self.crosshair_cursor.xx = None
+                #        self.crosshair_cursor.yy = None
+                #    else: 
+                #        self.crosshair_cursor.xx, self.crosshair_cursor.yy = plotlines[self.selected_line].get_data()
+        elif event.mouseevent.button == 3:
+            # print("  --> right")
+            if isinstance(event.artist, matplotlib.lines.Line2D):
+                # start line editing menu???
+                print("right action on line")
+            elif isinstance(event.artist, matplotlib.text.Text):
+                # delete line
+                # print("right action on text")
+                idx = textlines.index(event.artist)
+                msg = "Delete " + plotlines[idx].get_label() + "?" 
+                # + str(plotlines[idx].user_data['scale'])
+                menu = QMenu()
+                ActDelete = menu.addAction(msg)
+                ActScale = menu.addAction("Set scale")
+                ActReIm = menu.addAction("Toggle Real/Imag")
+                action = menu.exec(QCursor.pos())
+                if action == ActDelete:
+                    # print("Deleting")
+                    self.delete_simpson_data(idx)
+                elif action == ActScale:
+                    # print("manege scale ")
+                    self.set_line_scaling(idx)
+                elif action == ActReIm:
+                    self.toggle_reim(idx)
+                else:
+                    # print("canceling")
+                    pass
+        self.update_legend()
+    
+    # set scaling of individual line in plot
+    def set_line_scaling(self, idx):
+        #print("manege scale of line %d" % idx)
+        plotlines = self.get_plotlines()
+        line = plotlines[idx]
+        scale1 = line.user_data['scale']
+        # get new scaling factor
+        #scale2, completed = QInputDialog.getDouble(self, 'Line scaling', 'Enter new scaling factor:', scale1)
+        # the line above does the same as the following 7 lines, except here I can set Locale for decimal point (and not decimal comma as for czech locale...)
+        dlg = QInputDialog()
+        dlg.setWindowTitle('Line scaling');
+        dlg.setInputMode(QInputDialog.DoubleInput)
+        dlg.setLabelText('Enter new scaling factor: ')
+        dlg.setDoubleRange(-1e12, 1e12)  # practically unlimited upper bound
+        #spin_box = dlg.findChild(QDoubleSpinBox)
+        #if spin_box:
+        #    spin_box.setDecimals(6)  # allow up to 6 decimal places
+        dlg.setDoubleValue(scale1)
+        dlg.setLocale(QLocale(QLocale.English,QLocale.UnitedKingdom))
+        completed = dlg.exec()
+        # print(completed)
+        if not completed:
+            scale2 = scale1
+        else:
+            scale2 = dlg.doubleValue()
+        # apply new scaling
+        self.set_line_scale(line, scale2)
+        #if (self.crosshair_cursor is not None):
+        #    if (self.selected_line is None):
+        #        self.crosshair_cursor.xx = None
+        #        self.crosshair_cursor.yy = None
+        #    else: 
+        #         self.crosshair_cursor.xx, self.crosshair_cursor.yy = plotlines[self.selected_line].get_data()
+        # update figure
+        self.draw_idle()
+
+    # toggle if line shows real or imaginary part
+    def toggle_reim(self, idx):
+        print("toggle real / imag")
+        items = ["Real", "Imag"]
+        plotlines = self.get_plotlines()
+        line = plotlines[idx]
+        current = line.user_data['show']
+        item, ok = ListSelectionDialog().getItem(self,"Toggle Re/Im","Real or Imag?:", items, current)
+        if ok:
+            print("toggle re /im succsess")
+            line.user_data['show'] = item
+            yy = self.line_store.part(line.user_data['store_key'], item)
+            line.user_data['ydata'] = yy
+            line.user_data['ybounds'] = (np.nanmin(yy), np.nanmax(yy))
+            self.update_default_limits()
+            self.decimate_line(line)
+            self.snapped_cursor_update()
+            self.draw_idle()
+    
+    # figure context menu activated by right-click outside axes
+    def figure_context_menu(self):
+        menu = QMenu()
+        export_action = QAction("Export figure", self)
+        export_action.triggered.connect(self.export_figure)
+        menu.addAction(export_action)
+        edit_action = QAction("Edit figure", self)
+        edit_action.triggered.connect(self.edit_figure)
+        menu.addAction(edit_action)
+        crosshair_action = QAction("Crosshair cursor", self)
+        crosshair_action.triggered.connect(self.handle_crosshair_cursor)
+        menu.addAction(crosshair_action)
+        #xrev_action = QAction("Reverse x-axis", self)
+        #xrev_action.triggered.connect(self.handle_xrev)
+        #menu.addAction(xrev_action)
+        menu.exec(QCursor.pos())
+
+    def addToolcursor(self, tc):
+        self.toolcursor = tc
+        
+    def addToolxrev(self, xrev):
+        self.toolxrev = xrev
+        
+    def handle_crosshair_cursor(self):
+        if self.crosshair_cursor is None:
+            # start crusror regime
+            # print("cursor ON")
+            cursor = Cursor(self.axes) # Cursor does mpl_connect during __init__  
+            if (self.selected_line is not None):
+                user_data = self.get_plotlines()[self.selected_line].user_data
+                cursor.xx, cursor.yy = user_data['xdata'], user_data['ydata']
+                cursor.yscale = user_data['scale']
+            self.crosshair_cursor = cursor
+            self.toolcursor.setChecked(True)
+        else:
+            # cancel cursor regime (destructor of cursor)
+            # print("cursor OFF")
+            # self.crosshair_cursor.horizontal_line.remove()
+            # self.crosshair_cursor.vertical_line.remove()
+            # self.crosshair_cursor.text.remove()
+            # self.mpl_disconnect(self.crosshair_cursor.cid)
+            self.crosshair_cursor.remove_internals()
+            self.crosshair_cursor = None
+            self.toolcursor.setChecked(False)
+        
+    def handle_xrev(self):
+        if (self.toolxrev.isChecked()): 
+            #print("revx not compatible with zoom and other things...")
+            self.axes.xaxis.set_inverted(True)
+            self.defaultXlimits = tuple(sorted(self.defaultXlimits, reverse=True))
+        else:
+            self.axes.xaxis.set_inverted(False)
+            self.defaultXlimits = tuple(sorted(self.defaultXlimits))
+        # update figure
+        self.draw_idle()    
+
+    def export_figure(self):
+        print("save figure to file")
+        # ask filename
+        filename, _ = QFileDialog.getSaveFileName(self, "Export figure", "","(*.png *.pdf *.svg  *.eps *.jpg)")
+        # if dialog is cancelled i.e no path is selected
+        if not filename:
+            # return this method, i.e no action performed
+            return
+        # else call save to path method, exported figure contains full resolution data
+        self.show_full_resolution()
+        try:
+            self.fig.savefig(filename)
+        finally:
+            self.update_decimation()
+        
+    def edit_figure(self):
+        print("edit figure properties not implemented")
+
+# widen zero range (e.g. line of zeros) so that it can be used as axes limits
+def expand_singular(vmin, vmax):
+    if vmax > vmin:
+        return vmin, vmax
+    delta = 0.05*abs(vmin) if vmin != 0 else 0.05
+    return vmin - delta, vmax + delta
+
+# Reduce line data to min/max envelope of the visible x-range with one bin per pixel.
+# Within each bin the minimum and maximum are kept in their original order, so the drawn
+# line looks the same as the full data at screen resolution. x must be increasing.
+def minmax_decimate(xx, yy, xlim, npixels):
+    # keep one point outside the view on each side so that the line reaches the edges
+    i0 = max(np.searchsorted(xx, min(xlim)) - 1, 0)
+    i1 = min(np.searchsorted(xx, max(xlim)) + 1, len(xx))
+    count = i1 - i0
+    if count <= 4*npixels:
+        return xx[i0:i1], yy[i0:i1]
+    chunk = count // npixels
+    nbins = count // chunk
+    stop = i0 + nbins*chunk
+    ybins = np.asarray(yy[i0:stop]).reshape(nbins, chunk)
+    imin = ybins.argmin(axis=1)
+    imax = ybins.argmax(axis=1)
+    rows = np.arange(nbins)
+    first = np.minimum(imin, imax)
+    second = np.maximum(imin, imax)
+    xd = np.empty(2*nbins)
+    yd = np.empty(2*nbins)
+    xd[0::2] = xx[i0 + rows*chunk + first]
+    xd[1::2] = xx[i0 + rows*chunk + second]
+    yd[0::2] = ybins[rows, first]
+    yd[1::2] = ybins[rows, second]
+    # the last incomplete bin
+    if i1 - stop > 2:
+        tail = np.asarray(yy[stop:i1])
+        itail = np.sort([tail.argmin(), tail.argmax()]) + stop
+        return np.concatenate((xd, xx[itail])), np.concatenate((yd, yy[itail]))
+    return np.concatenate((xd, xx[stop:i1])), np.concatenate((yd, yy[stop:i1]))
+
+class InputScheduler:
+    """
+    Merges mouse motion and scroll events and applies them at most once per frame.
+    For motion only the latest event of each handler matters, scroll steps are summed.
+    """
+    def __init__(self, frame_rate):
+        self.period = 1.0/frame_rate
+        self.last_flush = 0.0
+        self.motions = {}  # handler -> latest motion event
+        self.scroll = None  # [handler, event] with accumulated step
+        self.timer = QTimer()
+        self.timer.setSingleShot(True)
+        self.timer.timeout.connect(self.flush)
+
+    def post_motion(self, handler, event):
+        self.motions[handler] = event
+        self.schedule()
+
+    def post_scroll(self, handler, event):
+        event.qt_modifiers = QApplication.keyboardModifiers()  # matplotlib keeps its own event.modifiers
+        if self.scroll is not None:
+            pending = self.scroll[1]
+            if self.scroll[0] == handler and pending.qt_modifiers == event.qt_modifiers and pending.inaxes == event.inaxes:
+                event.step += pending.step
+            else:
+                self.flush()
+        self.scroll = [handler, event]
+        self.schedule()
+
+    # forget pending motion event of handler (e.g. handler is being removed)
+    def cancel(self, handler):
+        self.motions.pop(handler, None)
+
+    def schedule(self):
+        if not self.timer.isActive():
+            delay = self.last_flush + self.period - time.perf_counter()
+            self.timer.start(max(0, int(1000*delay)))
+
+    # apply pending events now
+    def flush(self):
+        self.timer.stop()
+        self.last_flush = time.perf_counter()
+        motions = self.motions
+        scroll = self.scroll
+        self.motions = {}
+        self.scroll = None
+        for handler, event in motions.items():
+            handler(event)
+        if scroll is not None:
+            scroll[0](scroll[1])
+
+class LineStore:
+    """
+    Full resolution data of plotted lines.
+    Complex data of each line are kept as one contiguous array, optionally downcast to complex64.
+    Lines with identical x-axis (same NP, SW, REF in SIMPSON files) share a single copy of it.
+    """
+    def __init__(self, single_precision=False):
+        self.dtype = np.complex64 if single_precision else np.complex128
+        self.data = {}   # key -> complex data
+        self.xkeys = {}  # key -> key of x-axis
+        self.xaxes = {}  # key of x-axis -> [list of x-axes with this key, list of their reference counts]
+        self.next_key = 0
+
+    # store data of a new line, returns key to access them
+    def add(self, cplx, xdata):
+        # data already in the right dtype (e.g. memory mapped cache entry) are not copied
+        cplx = np.ascontiguousarray(cplx, dtype=self.dtype)
+        key = self.next_key
+        self.next_key += 1
+        self.data[key] = cplx
+        self.xkeys[key] = self.add_xaxis(np.ascontiguousarray(xdata, dtype=np.float64))
+        return key
+
+    # x-axes are evenly spaced, number of points and end points identify them
+    # the key is only a hint, x-axes are compared before they are shared
+    def add_xaxis(self, xdata):
+        xkey = (len(xdata), float(xdata[0]), float(xdata[-1])) if len(xdata) > 0 else (0,)
+        axes, counts = self.xaxes.setdefault(xkey, [[], []])
+        for i, xx in enumerate(axes):
+            if xx is not None and (xx is xdata or np.array_equal(xx, xdata)):
+                counts[i] += 1
+                return (xkey, i)
+        axes.append(xdata)
+        counts.append(1)
+        return (xkey, len(axes)-1)
+
+    def remove(self, key):
+        cplx = self.data.pop(key, None)
+        if cplx is None:
+            return
+        xkey, i = self.xkeys.pop(key)
+        axes, counts = self.xaxes[xkey]
+        counts[i] -= 1
+        # x-axes are addressed by their position in the list, unused ones are only released
+        if counts[i] == 0:
+            axes[i] = None
+        if sum(counts) == 0:
+            del self.xaxes[xkey]
+
+    def xdata(self, key):
+        xkey, i = self.xkeys[key]
+        return self.xaxes[xkey][0][i]
+
+    # real or imaginary part as a view, no copy is made
+    def part(self, key, show):
+        if show == "Imag":
+            return self.data[key].imag
+        return self.data[key].real
+
+
+class BlitManager:
+    """
+    Redraw of animated artists (crosshair cursor etc.) without rendering the whole figure.
+    Rendered figure is copied after each full draw and animated artists are drawn over it.
+    """
+    def __init__(self, canvas):
+        self.canvas = canvas
+        self.background = None
+        self.artists = []
+        self.pan_offset = None  # (dx, dy) in pixels, plot area of background is shifted during fast pan
+        # every full draw (resize, change of limits, new data) invalidates the stored background
+        canvas.mpl_connect('draw_event', self.on_draw)
+
+    def add_artist(self, artist):
+        artist.set_animated(True)
+        self.artists.append(artist)
+
+    def remove_artist(self, artist):
+        self.artists.remove(artist)
+        artist.remove()
+
+    def on_draw(self, event):
+        self.background = self.canvas.copy_from_bbox(self.canvas.figure.bbox)
+        self.draw_artists()
+
+    def draw_artists(self):
+        figure = self.canvas.figure
+        for artist in self.artists:
+            figure.draw_artist(artist)
+
+    # restore the background, draw animated artists and show the result
+    def update(self):
+        if self.background is None:
+            self.canvas.draw_idle()
+            return
+        self.canvas.restore_region(self.background)
+        if self.pan_offset is not None:
+            self.draw_panned()
+        self.draw_artists()
+        self.canvas.blit(self.canvas.figure.bbox)
+
+    # draw plot area of the background shifted by pan_offset, uncovered part stays empty
+    def draw_panned(self):
+        figure = self.canvas.figure
+        ax = self.canvas.axes
+        dx, dy = self.pan_offset
+        # plot area without spines (they are drawn again at their place)
+        x0, y0, x1, y1 = ax.bbox.extents + np.array([3, 3, -3, -3])
+        # Agg buffer coordinates have y axis pointing down
+        height = figure.bbox.height
+        top, bottom = height - y1, height - y0
+        figure.draw_artist(ax.patch)
+        # part of the plot area which stays inside the axes after shifting
+        sx0, sx1 = max(x0, x0 - dx), min(x1, x1 - dx)
+        sy0, sy1 = max(top, top + dy), min(bottom, bottom + dy)
+        if (sx1 > sx0) and (sy1 > sy0):
+            self.canvas.restore_region(self.background, bbox=[int(sx0), int(sy0), int(sx1), int(sy1)], xy=(int(dx), int(-dy)))
+        for spine in ax.spines.values():
+            figure.draw_artist(spine)
+
+class Cursor:
+    """
+    A cross hair cursor.
+    """
+    def __init__(self, ax):
+        self.ax = ax
+        # cursor artists are animated, they are blitted over cached background of the figure
+        self.blit_manager = ax.figure.canvas.blit_manager
+        self.horizontal_line = ax.axhline(color='k', lw=0.8, ls='--', label='__cursor__')
+        self.vertical_line = ax.axvline(color='k', lw=0.8, ls='--', label='__cursor__')
+        # text location in axes coordinates
+        self.text = ax.text(0.02, 0.95, '', transform=ax.transAxes, bbox=dict(facecolor='red', alpha=0.5))
+        self.blit_manager.add_artist(self.horizontal_line)
+        self.blit_manager.add_artist(self.vertical_line)
+        self.blit_manager.add_artist(self.text)
+        # line data used for snapped cursor mode (when a line is selected)
+        self.xx = None
+        self.yy = None
+        self.yscale = 1.0  # scale factor of the selected line (its ydata are not scaled)
+        self.lastindex = None
+        # distance measurements activated by left click
+        self.position_origin = None
+        # connected action slot ID, mouse moves go through the input scheduler of the canvas
+        scheduler = self.ax.figure.canvas.input_scheduler
+        cid = self.ax.figure.canvas.mpl_connect('motion_notify_event', lambda event: scheduler.post_motion(self.on_mouse_move, event))
+        self.cid = [cid]
+        cid = self.ax.figure.canvas.mpl_connect('button_press_event', self.on_mouse_button)
+        self.cid.append(cid)
+        # cid = self.ax.figure.canvas.mpl_connect('button_release_event', self.off_mouse_button)
+        # self.cid.append(cid) 
+        self.position_origin_horizontal_line = None
+        self.position_origin_vertical_line = None
+        self.position_delta_text = None
+
+    def remove_internals(self):
+        self.ax.figure.canvas.input_scheduler.cancel(self.on_mouse_move)
+        self.blit_manager.remove_artist(self.horizontal_line)
+        self.blit_manager.remove_artist(self.vertical_line)
+        self.blit_manager.remove_artist(self.text)
+        if self.position_origin_horizontal_line is not None:
+            self.remove_origin()
+        self.blit_manager.update()
+        for cid in self.cid:
+            self.ax.figure.canvas.mpl_disconnect(cid)
+
+    def remove_origin(self):
+        self.blit_manager.remove_artist(self.position_origin_horizontal_line)
+        self.blit_manager.remove_artist(self.position_origin_vertical_line)
+        self.blit_manager.remove_artist(self.position_delta_text)
+        self.position_origin_horizontal_line = None
+        self.position_origin_vertical_line = None
+        self.position_delta_text = None
+        
+    # def off_mouse_button(self,event):
+    #     print("cursor mouse released: ",event)
+    #     if (event.button == 1) and event.dblclick:
+    #         print("  -- Hught -- ")
+            
+    def on_mouse_button(self, event):
+        if (event.button == 1) and event.dblclick and (event.inaxes is not None):
+            if self.position_origin is None:
+                if (self.lastindex is not None) and (self.xx is not None):
+                    x = self.xx[self.lastindex]
+                    y = self.yy[self.lastindex]*self.yscale
+                else:
+                    x = event.xdata
+                    y = event.ydata
+                self.position_origin = (x, y)
+                self.position_origin_horizontal_line = self.ax.axhline(y=y, color='k', lw=0.8, ls='--', label='__cursor__')
+                self.position_origin_vertical_line = self.ax.axvline(x=x, color='k', lw=0.8, ls='--', label='__cursor__')
+                self.position_delta_text = self.ax.text(x, y, ' dx=0, dy=0', verticalalignment='bottom')
+                self.blit_manager.add_artist(self.position_origin_horizontal_line)
+                self.blit_manager.add_artist(self.position_origin_vertical_line)
+                self.blit_manager.add_artist(self.position_delta_text)
+            else:
+                self.position_origin = None
+                self.remove_origin()
+            self.blit_manager.update()
+            # print(" pos orig: ",self.position_origin)
+        
+        
+    def set_cross_hair_visible(self, visible):
+        need_redraw = self.horizontal_line.get_visible() != visible
+        self.horizontal_line.set_visible(visible)
+        self.vertical_line.set_visible(visible)
+        self.text.set_visible(visible)
+        return need_redraw
+
+    def on_mouse_move(self, event):
+        if not event.inaxes:
+            need_redraw = self.set_cross_hair_visible(False)
+            if need_redraw:
+                self.blit_manager.update()
+        else:
+            self.set_cross_hair_visible(True)
+            # event may be delayed by the input scheduler, limits may have changed
+            x, y = self.ax.transData.inverted().transform((event.x, event.y))
+            # update the line positions
+            if self.xx is not None:
+                # snapped version
+                index = min(np.searchsorted(self.xx, x), len(self.xx) - 1)
+                if index == self.lastindex: # do not move the cursor
+                    return
+                self.lastindex = index
+                x = self.xx[index]
+                y = self.yy[index]*self.yscale
+            else:
+                self.lastindex = None
+            # general version
+            self.horizontal_line.set_ydata([y])
+            self.vertical_line.set_xdata([x])
+            if self.position_origin is None:
+                self.text.set_text('x=%1.2f, y=%1.2f' % (x, y))
+            else:
+                dx = x - self.position_origin[0] 
+                dy = y - self.position_origin[1]
+                self.position_delta_text.set_text(' dx=%1.2f, dy=%1.2f' % (dx, dy))
+                self.position_delta_text.set_position((x,y))
+            self.blit_manager.update()
+
+
+# Nice dialog for selection from list, all items visible
+class ListSelectionDialog(QDialog):
+    def __init__(self, parent=None, title="Select Item", question="", items=None, current_item=None):
+        super().__init__(parent)
+        self.setWindowTitle(title)
+        self.choice = None
+        items = items or []
+
+        layout = QVBoxLayout()
+        # Optional question label
+        if question:
+            self.label = QLabel(question)
+            self.label.setAlignment(Qt.AlignCenter)
+            layout.addWidget(self.label)
+        # List widget
+        self.list_widget = QListWidget()
+        self.list_widget.addItems(items)
+        layout.addWidget(self.list_widget, alignment=Qt.AlignCenter)
+        # adjust its sizes
+        item_count = self.list_widget.count()
+        height = self.list_widget.sizeHintForRow(0)*item_count + 2*self.list_widget.frameWidth() + 4 # extra padding
+        width = 0
+        for i in range(item_count):
+            item_width = self.list_widget.sizeHintForIndex(self.list_widget.model().index(i, 0)).width()
+            width = max(width, item_width)
+        width = width + 2 * self.list_widget.frameWidth() + 20 # padding + scrollbar space
+        self.list_widget.setFixedSize(width, height) 
+        # Preselect item if specified
+        if current_item and current_item in items:
+            index = items.index(current_item)
+            self.list_widget.setCurrentRow(index)
+        elif items:
+            self.list_widget.setCurrentRow(0)
+        # Push OK button
+        self.ok_button = QPushButton("OK")
+        self.ok_button.clicked.connect(self.confirm_selection)
+        layout.addWidget(self.ok_button, alignment=Qt.AlignCenter)
+        # finish the dialog
+        self.setLayout(layout)
+        self.setWindowModality(Qt.ApplicationModal)        
+
+    def confirm_selection(self):
+        item = self.list_widget.currentItem()
+        if item:
+            self.choice = item.text()
+        self.accept()  # closes the dialog
+
+    @staticmethod
+    def getItem(parent=None, title="Select Item", question="", items=None, current_item=None):
+        dialog = ListSelectionDialog(parent, title, question, items, current_item)
+        result = dialog.exec_()
+        return (dialog.choice, result == QDialog.Accepted)
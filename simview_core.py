@@ -0,0 +1,607 @@
+# -*- coding: utf-8 -*-
+"""
+Part of SIMPSON-view that does not need Qt: reading and writing FID/SPE files, caches,
+SIMPSON input handling (parameters, referenced files, crystallite splitting).
+Used by the GUI in simview.py and by the command-line batch mode in simview_batch.py.
+"""
+import os, re, glob, json, hashlib, time, shutil, threading, tempfile
+import numpy as np
+
+
+### L O A D I N G   FID / SPE   D A T A   P A R T
+# directory where simview keeps its caches
+def simview_cache_path(path=""):
+    if path:
+        return path
+    return os.path.join(os.path.expanduser("~"), ".simview_cache")
+
+# parse FID/SPE file in a process of bulk import, return (xx, cplx, datatype)
+def import_simpson_fidspe(fileName, cache_path, cache_size_mb):
+    cplx, info = FidSpeCache(cache_path, cache_size_mb).load(fileName, read_simpson_fidspe)
+    return simpson_xaxis(info, len(cplx)), np.asarray(cplx), info['TYPE']
+
+# parse FID/SPE file, return complex data and header info
+def read_simpson_fidspe(fileName):
+    with open(fileName, 'rb') as file:
+        # check the first line for SIMP
+        line =  file.readline()
+        if line.strip() != b"SIMP":
+            print("Not simpson file:")
+            print(fileName)
+        info = read_simpson_header(file)
+        if info.get('FORMAT') == "BINARY":
+            # binary output (fsave -binary) is decoded directly from memory-mapped file
+            cplx = decode_simpson_binary(fileName, file.tell(), info['NP'])
+        else:
+            # the rest of the file is DATA block terminated by END, parse it in one numpy call
+            text = file.read().decode('ascii')
+            endpos = text.find("END")
+            if endpos >= 0:
+                text = text[:endpos]
+            values = np.fromstring(text, dtype=np.float64, sep=' ')
+            # pairs (re, im) are viewed as complex numbers without copying
+            cplx = values[:2*(values.size//2)].view(np.complex128)
+        if len(cplx) < info['NP']:
+            print("Error: found only %d data points, expected %d" % (len(cplx), info['NP']))
+    return cplx[:info['NP']], info
+
+# SIMPSON binary format stores little-endian float32 (re, im) pairs encoded to printable
+# characters: every 4 characters (code-33, 6 bits each) carry 3 bytes of data.
+# File is memory-mapped, decoding is vectorized and the decoded bytes are viewed as complex64.
+def decode_simpson_binary(fileName, offset, np_points):
+    raw = np.memmap(fileName, dtype=np.uint8, mode='r', offset=offset)
+    # data block is terminated by END on its own line (END characters may appear inside data)
+    tail = bytes(raw[-16:])
+    endpos = tail.rfind(b"\nEND")
+    if endpos >= 0:
+        raw = raw[:len(raw)-len(tail)+endpos]
+    # drop line breaks and white space, keep encoded characters only
+    enc = raw[raw > 32] - np.uint8(33)
+    del raw
+    enc = enc[:4*(len(enc)//4)].reshape(-1, 4)
+    dec = np.empty((len(enc), 3), dtype=np.uint8)
+    dec[:,0] = (enc[:,0] << 2) | (enc[:,1] >> 4)
+    dec[:,1] = ((enc[:,1] & 15) << 4) | (enc[:,2] >> 2)
+    dec[:,2] = ((enc[:,2] & 3) << 6) | enc[:,3]
+    dec = dec.reshape(-1)
+    nbytes = min(8*np_points, 8*(len(dec)//8))
+    return dec[:nbytes].view('<c8')
+
+# read header lines of SIMP file up to DATA keyword, return them as dictionary
+def read_simpson_header(file):
+    info = {}
+    for line in file:
+        line = line.decode('ascii').strip()
+        if line == "DATA":
+            # data start here
+            break
+        else:
+            # read header
+            ll = line.split("=")
+            info[ll[0]]=ll[1]
+    if 'NP' in info:
+        info['NP'] = int(info['NP'])
+    else:
+        print("Error: NP not found")
+    if 'SW' in info:
+        info['SW'] = float(info['SW'])
+    else:
+        print("Error: SW not found")
+    if 'REF' in info:
+        info['REF'] = float(info['REF'])
+    else:
+        info['REF'] = 0
+    return info
+
+# create x axis (frequency in Hz for SPE, time in ms for FID) for np points
+def simpson_xaxis(info, np_points):
+    if info['TYPE'] == "SPE":
+        corr = info['SW']/2-info['REF']
+        stx = info['SW']/(info['NP']-1)
+    elif info['TYPE'] == "FID":
+        stx = 1.0e3/info['SW']
+        corr = 0
+    else:
+        print("Error: unknown TYPE ",info['TYPE'])
+    return np.arange(np_points)*stx - corr
+
+class FidSpeCache:
+    """
+    On-disk cache of parsed FID/SPE files.
+    Complex data are stored as .npy files (loaded memory-mapped), header info in .json files.
+    Entries are keyed by absolute path and invalidated by size and modification time of the
+    original file, least recently used entries are removed when the size limit is exceeded.
+    """
+    def __init__(self, path, size_limit_mb):
+        self.path = path
+        self.size_limit = size_limit_mb*1024*1024
+
+    # return base name (without extension) of cache entry belonging to fileName
+    def entry_name(self, fileName):
+        key = hashlib.sha1(os.path.abspath(fileName).encode('utf8')).hexdigest()
+        return os.path.join(self.path, key)
+
+    # return (cplx, info) of fileName, parse it using parser function if not cached
+    def load(self, fileName, parser):
+        if self.size_limit <= 0:
+            return parser(fileName)
+        stat = os.stat(fileName)
+        base = self.entry_name(fileName)
+        stamp = {'path': os.path.abspath(fileName), 'size': stat.st_size, 'mtime': stat.st_mtime_ns}
+        try:
+            with open(base+".json", 'r') as f:
+                meta = json.load(f)
+            if meta['stamp'] == stamp:
+                cplx = np.load(base+".npy", mmap_mode='r')
+                # mark entry as recently used
+                os.utime(base+".npy")
+                return cplx, meta['info']
+        except (OSError, ValueError, KeyError):
+            pass
+        cplx, info = parser(fileName)
+        self.store(base, cplx, info, stamp)
+        return cplx, info
+
+    def store(self, base, cplx, info, stamp):
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            # write to temporary files first, replace is atomic (other processes may read the entry)
+            # the name is unique per thread, loader threads may store the same file at once
+            tmp = "%s.%d.%d.tmp" % (base, os.getpid(), threading.get_ident())
+            np.save(tmp+".npy", np.ascontiguousarray(cplx))
+            with open(tmp+".json", 'w') as f:
+                json.dump({'stamp': stamp, 'info': info}, f)
+            os.replace(tmp+".npy", base+".npy")
+            os.replace(tmp+".json", base+".json")
+        except OSError as e:
+            print("FID/SPE cache: "+str(e))
+            return
+        self.evict()
+
+    # remove least recently used entries until the cache fits into size limit
+    def evict(self):
+        entries = []
+        for name in glob.glob(os.path.join(self.path, "*.json")):
+            base = name[:-len(".json")]
+            try:
+                stat = os.stat(base+".npy")
+            except OSError:
+                continue
+            entries.append((stat.st_mtime, stat.st_size, base))
+        total = sum(e[1] for e in entries)
+        for mtime, size, base in sorted(entries):
+            if total <= self.size_limit:
+                break
+            if self.remove_entry(base):
+                total -= size
+
+    def remove_entry(self, base):
+        try:
+            os.remove(base+".json")
+            os.remove(base+".npy")
+        except OSError:
+            # file may be memory-mapped by a loaded line (Windows)
+            return False
+        return True
+
+    def clear(self):
+        for name in glob.glob(os.path.join(self.path, "*.json")):
+            self.remove_entry(name[:-len(".json")])
+
+# files referenced by SIMPSON input: names in the text that exist in workdir (crystal files may omit .cry)
+# outputs of the input (FID/SPE/xy named after it, files written by fsave) are not considered to be input,
+# other FID/SPE files are (e.g. data read by fload)
+def simpson_input_files(text, workdir, inputfile=None, found=None, outputs=None):
+    if found is None:
+        found = set()
+        outputs = set()
+        if inputfile is not None:
+            rootname = os.path.splitext(inputfile)[0]
+            outputs.update(os.path.normpath(os.path.join(workdir, rootname+ext)) for ext in (".fid", ".spe", ".xy"))
+    # file names in the directory are looked up in one listing, not by a stat of every word
+    try:
+        listing = set(entry.name for entry in os.scandir(workdir) if entry.is_file())
+    except OSError:
+        listing = set()
+    outputs.update(os.path.normpath(os.path.join(workdir, name)) for name in re.findall(r"^\s*fsave\s+\S+\s+([^\s$\[\]]+)\s*$", text, re.M))
+    # numbers (shapes, crystallites) are not file names, purely numeric lines are skipped at once
+    numeric = re.compile(r"[\d\s.,eE+\-]*")
+    text = "\n".join(line for line in text.splitlines() if not numeric.fullmatch(line))
+    for token in set(re.findall(r"[\w.+\-/\\]+", text)):
+        if numeric.fullmatch(token):
+            continue
+        for name in (token, token+".cry"):
+            path = os.path.normpath(os.path.join(workdir, name))
+            if path in found or path in outputs:
+                continue
+            if os.path.dirname(path) == os.path.normpath(workdir):
+                if os.path.basename(path) not in listing:
+                    continue
+            elif not os.path.isfile(path):
+                continue
+            found.add(path)
+            # sourced scripts may reference further files
+            if path.endswith(".tcl") or path.endswith(".in"):
+                try:
+                    with open(path, 'r') as f:
+                        simpson_input_files(f.read(), workdir, found=found, outputs=outputs)
+                except (OSError, UnicodeDecodeError):
+                    pass
+    return found
+
+# hash of everything a SIMPSON run depends on: input, files it reads, executable and environment
+def simpson_run_key(workdir, inputfile, executable, environment):
+    key = hashlib.sha256()
+    inputpath = os.path.normpath(os.path.join(workdir, inputfile))
+    with open(inputpath, 'rb') as f:
+        text = f.read()
+    # file name matters, SIMPSON sets par(name) from it
+    key.update(json.dumps([inputfile, len(text)]).encode('utf8'))
+    key.update(text)
+    files = simpson_input_files(text.decode('utf8', errors='replace'), workdir, inputfile)
+    files.discard(inputpath)
+    for path in sorted(files):
+        with open(path, 'rb') as f:
+            data = f.read()
+        key.update(json.dumps([os.path.relpath(path, workdir), len(data)]).encode('utf8'))
+        key.update(data)
+    stat = os.stat(executable)
+    env = dict(environment)
+    for name in ("PATH", "TCLLIBPATH", "OMP_NUM_THREADS"):
+        env[name] = os.environ.get(name, "")
+    key.update(json.dumps([os.path.abspath(executable), stat.st_size, stat.st_mtime_ns, sorted(env.items())]).encode('utf8'))
+    return key.hexdigest()
+
+# size and modification time of files in directory
+def directory_snapshot(path):
+    snapshot = {}
+    try:
+        for entry in os.scandir(path):
+            if entry.is_file():
+                stat = entry.stat()
+                snapshot[entry.name] = (stat.st_size, stat.st_mtime_ns)
+    except OSError as e:
+        print(str(e))
+    return snapshot
+
+# names of files created or modified since snapshot was taken
+def directory_changes(path, snapshot):
+    current = directory_snapshot(path)
+    return sorted(name for name, stamp in current.items() if snapshot.get(name) != stamp)
+
+# output files of a run among files changed since snapshot: files named after the input (x.fid for x.in),
+# files on simview lines and new FID/SPE/xy files; files the input reads are never outputs
+# (other files may have been saved by the user meanwhile), new FID/SPE/xy files may be of
+# another job when more jobs run in the directory
+def simpson_output_files(workdir, inputfile, snapshot, simview_names, shared_workdir=False):
+    rootname = os.path.splitext(inputfile)[0]
+    try:
+        with open(os.path.join(workdir, inputfile), 'r', errors='replace') as f:
+            inputs = simpson_input_files(f.read(), workdir, inputfile)
+    except OSError:
+        inputs = set()
+    names = []
+    for name in directory_changes(workdir, snapshot):
+        if name == inputfile or os.path.normpath(os.path.join(workdir, name)) in inputs:
+            continue
+        root, ext = os.path.splitext(name)
+        if root == rootname or name in simview_names:
+            names.append(name)
+        elif not shared_workdir and ext in (".fid", ".spe", ".xy") and name not in snapshot:
+            names.append(name)
+    return names
+
+# size and modification time of file, as stored in json
+def file_stamp(path):
+    stat = os.stat(path)
+    return [stat.st_size, stat.st_mtime_ns]
+
+class ResultCache:
+    """
+    On-disk cache of SIMPSON runs.
+    Entry directory is named by simpson_run_key, it holds copies of output files and the output log.
+    Entries older than max_age_days are removed, least recently used ones when the size limit is exceeded.
+    Size and modification time of output files written or restored in a directory are recorded, a restore
+    does not overwrite a file changed by someone else since.
+    """
+    def __init__(self, path, size_limit_mb, max_age_days):
+        self.path = path
+        self.size_limit = size_limit_mb*1024*1024
+        self.max_age = max_age_days*24*3600
+        self.lock = threading.Lock()  # batch mode runs inputs in threads
+
+    def enabled(self):
+        return self.size_limit > 0
+
+    # return meta data of cached run or None
+    def lookup(self, key):
+        meta_name = os.path.join(self.path, key, "meta.json")
+        try:
+            with open(meta_name, 'r') as f:
+                meta = json.load(f)
+            # mark entry as recently used
+            os.utime(meta_name)
+        except (OSError, ValueError):
+            return None
+        return meta
+
+    # copy cached output files to workdir, files not written by simview last are not overwritten
+    def restore(self, key, meta, workdir):
+        with self.lock:
+            written = self.written_files(workdir)
+            for name in meta['files']:
+                target = os.path.join(workdir, name)
+                if os.path.exists(target) and file_stamp(target) != written.get(name):
+                    raise OSError("%s was changed since simview wrote it" % target)
+            for name in meta['files']:
+                shutil.copy2(os.path.join(self.path, key, "files", name), os.path.join(workdir, name))
+            self.record_written(workdir, meta['files'], written)
+
+    # record of output files written or restored in workdir
+    def written_record(self, workdir):
+        return os.path.join(self.path, "written", hashlib.sha1(os.path.abspath(workdir).encode('utf8')).hexdigest()+".json")
+
+    def written_files(self, workdir):
+        return read_json_cache(self.written_record(workdir), os.path.abspath(workdir)) or {}
+
+    def record_written(self, workdir, names, written):
+        for name in names:
+            try:
+                written[name] = file_stamp(os.path.join(workdir, name))
+            except OSError:
+                written.pop(name, None)
+        write_json_cache(self.written_record(workdir), os.path.abspath(workdir), written)
+
+    def store(self, key, workdir, names, log):
+        entry = os.path.join(self.path, key)
+        # entry is written to a temporary directory first, rename makes it visible at once
+        tmp = "%s.%d.%d.tmp" % (entry, os.getpid(), threading.get_ident())
+        try:
+            shutil.rmtree(tmp, ignore_errors=True)
+            os.makedirs(os.path.join(tmp, "files"))
+            for name in names:
+                shutil.copy2(os.path.join(workdir, name), os.path.join(tmp, "files", name))
+            with open(os.path.join(tmp, "meta.json"), 'w') as f:
+                json.dump({'files': names, 'log': log, 'created': time.time()}, f)
+            shutil.rmtree(entry, ignore_errors=True)
+            os.replace(tmp, entry)
+            with self.lock:
+                self.record_written(workdir, names, self.written_files(workdir))
+        except OSError as e:
+            print("Result cache: "+str(e))
+            shutil.rmtree(tmp, ignore_errors=True)
+            return
+        self.evict()
+
+    # remove too old entries, then least recently used ones until the cache fits into size limit
+    def evict(self):
+        entries = []
+        now = time.time()
+        for meta_name in glob.glob(os.path.join(self.path, "*", "meta.json")):
+            entry = os.path.dirname(meta_name)
+            try:
+                mtime = os.stat(meta_name).st_mtime
+                size = sum(os.path.getsize(os.path.join(dirpath, name)) for dirpath, dirnames, names in os.walk(entry) for name in names)
+            except OSError:
+                continue
+            if now - mtime > self.max_age:
+                shutil.rmtree(entry, ignore_errors=True)
+            else:
+                entries.append((mtime, size, entry))
+        total = sum(e[1] for e in entries)
+        for mtime, size, entry in sorted(entries):
+            if total <= self.size_limit:
+                break
+            shutil.rmtree(entry, ignore_errors=True)
+            total -= size
+
+    def clear(self):
+        for meta_name in glob.glob(os.path.join(self.path, "*", "meta.json")):
+            shutil.rmtree(os.path.dirname(meta_name), ignore_errors=True)
+
+# write complex data to SIMP file in text format, header from info as returned by read_simpson_fidspe
+def save_simpson_fidspe(fileName, cplx, info):
+    with open(fileName, 'w') as f:
+        f.write("SIMP\n")
+        f.write("NP=%d\n" % len(cplx))
+        f.write("SW=%.10g\n" % info['SW'])
+        f.write("REF=%.10g\n" % info['REF'])
+        f.write("TYPE=%s\n" % info['TYPE'])
+        for key, value in info.items():
+            if key not in ('NP', 'SW', 'REF', 'TYPE', 'FORMAT'):
+                f.write("%s=%s\n" % (key, value))
+        f.write("DATA\n")
+        np.savetxt(f, np.column_stack((np.real(cplx), np.imag(cplx))), fmt="%.10e")
+        f.write("END\n")
+
+# write input text to its own directory together with files it references (relative paths stay valid)
+def copy_simpson_input(workdir, files, targetdir, inputfile, text):
+    os.makedirs(targetdir)
+    for path in files:
+        target = os.path.join(targetdir, os.path.relpath(path, workdir))
+        os.makedirs(os.path.dirname(target), exist_ok=True)
+        shutil.copyfile(path, target)
+    with open(os.path.join(targetdir, inputfile), 'w') as f:
+        f.write(text)
+
+# files referenced by input that are inside its directory (they can be copied along with the input)
+def simpson_local_input_files(text, workdir, inputfile):
+    return [path for path in simpson_input_files(text, workdir, inputfile) if not os.path.relpath(path, workdir).startswith("..")]
+
+class ParallelRun:
+    """
+    SIMPSON input split to several runs by crystallites of its crystal file.
+    Every part runs in its own directory with a subset of crystallites (weights normalized within the
+    subset), results are summed with the subset weights. Powder average is linear, so the sum equals
+    single-process result as long as the script processes the data linearly (fft, apodization, phasing).
+    """
+    def __init__(self, inputfilename):
+        self.workdir, self.inputfile = os.path.split(inputfilename)
+        self.partdir = None  # directory of part directories, unique for every run (more runs may be active)
+        self.partdirs = []
+        self.weights = []
+        self.jobs = []
+        self.reference = None
+        self.submitted = False  # all jobs are in the queue
+
+    # write inputs of parts (and of the reference single-process run), return their file names
+    def prepare(self, chunks, verify=False):
+        with open(os.path.join(self.workdir, self.inputfile), 'r') as f:
+            text = f.read()
+        name = parameter_value(text, "par(crystal_file)")
+        if name is None:
+            raise ValueError("crystal_file not found in par block")
+        cryname = os.path.join(self.workdir, name)
+        if not os.path.isfile(cryname):
+            cryname += ".cry"
+        if not os.path.isfile(cryname):
+            raise ValueError("crystal file %s not found in input directory, built-in crystallite sets can not be split" % name)
+        crystallites = np.loadtxt(cryname, skiprows=1, ndmin=2)
+        if crystallites.shape[1] < 3:
+            raise ValueError("crystal file %s has no weights" % cryname)
+        chunks = min(chunks, len(crystallites))
+        # files referenced by the input are copied to every part directory
+        files = simpson_local_input_files(text, self.workdir, self.inputfile)
+        self.partdir = tempfile.mkdtemp(prefix=os.path.splitext(self.inputfile)[0]+"_parallel", dir=self.workdir)
+        inputs = []
+        for k, part in enumerate(np.array_split(crystallites, chunks)):
+            partdir = os.path.join(self.partdir, "part%d" % (k+1))
+            self.copy_input(partdir, text, files)
+            weight = np.sum(part[:,2])
+            partcry = "simview_part%d" % (k+1)
+            with open(os.path.join(partdir, partcry+".cry"), 'w') as f:
+                f.write("%d\n" % len(part))
+                np.savetxt(f, np.column_stack((part[:,0], part[:,1], part[:,2]/weight)), fmt="%.10g")
+            with open(os.path.join(partdir, self.inputfile), 'w') as f:
+                f.write(substitute_parameter(text, "par(crystal_file)", partcry))
+            self.partdirs.append(partdir)
+            self.weights.append(weight)
+            inputs.append(os.path.join(partdir, self.inputfile))
+        if verify:
+            partdir = os.path.join(self.partdir, "reference")
+            self.copy_input(partdir, text, files)
+            inputs.append(os.path.join(partdir, self.inputfile))
+        return inputs
+
+    def copy_input(self, partdir, text, files):
+        copy_simpson_input(self.workdir, files, partdir, self.inputfile, text)
+
+    # sum results of parts to input directory, return their names and relative deviations from reference run
+    def merge(self):
+        names = self.jobs[0].simview_names
+        if not names:
+            raise ValueError("no results named on simview line")
+        total = sum(self.weights)
+        deviations = []
+        for name in names:
+            merged = None
+            for partdir, weight in zip(self.partdirs, self.weights):
+                cplx, info = read_simpson_fidspe(os.path.join(partdir, name))
+                part = (weight/total) * cplx.astype(np.complex128)
+                merged = part if merged is None else merged + part
+            save_simpson_fidspe(os.path.join(self.workdir, name), merged, info)
+            if self.reference is not None:
+                reference, _ = read_simpson_fidspe(os.path.join(self.partdir, "reference", name))
+                deviations.append(np.max(np.abs(merged - reference)) / max(np.max(np.abs(reference)), 1e-300))
+        return names, deviations
+
+    def cleanup(self):
+        if self.partdir is not None:
+            shutil.rmtree(self.partdir, ignore_errors=True)
+
+
+### P A R A M E T E R   S W E E P   P A R T
+# values are given as a list (1000, 2000, 5000) or as start:stop:count
+def parse_sweep_values(spec):
+    spec = spec.strip()
+    if spec.count(":") == 2:
+        start, stop, count = spec.split(":")
+        return ["%.10g" % v for v in np.linspace(float(start), float(stop), int(count))]
+    return spec.replace(",", " ").split()
+
+# set value of par(key) in par block or of a variable set by 'set name value', None if not found
+def substitute_parameter(text, name, value):
+    match = find_parameter(text, name)
+    if match is None:
+        return None
+    return text[:match.start(2)] + value + text[match.end(2):]
+
+# current value of parameter (as in substitute_parameter), None if not found
+def parameter_value(text, name):
+    match = find_parameter(text, name)
+    if match is None:
+        return None
+    return match.group(2)
+
+# match object with the parameter value as group 2
+def find_parameter(text, name):
+    match = None
+    key = re.fullmatch(r"par\((\w+)\)", name)
+    if key is not None:
+        block = re.search(r"^\s*par\s*\{", text, re.M)
+        if block is not None:
+            # end of the par block is its matching brace
+            depth = 0
+            end = len(text)
+            for i in range(block.end()-1, len(text)):
+                if text[i] == "{":
+                    depth += 1
+                elif text[i] == "}":
+                    depth -= 1
+                    if depth == 0:
+                        end = i
+                        break
+            match = re.compile(r"^(\s*"+key.group(1)+r"\s+)(\S+)", re.M).search(text, block.end(), end)
+    if match is None:
+        match = re.search(r"^(\s*set\s+"+re.escape(name)+r"\s+)(\S+)", text, re.M)
+    return match
+
+
+### S T A R T U P   P A R T
+# value stored by write_json_cache under the same key, None if missing or stale
+def read_json_cache(filename, key):
+    try:
+        with open(filename, 'r') as f:
+            entry = json.load(f)
+        if entry['key'] == key:
+            return entry['value']
+    except (OSError, ValueError, KeyError, TypeError):
+        pass
+    return None
+
+def write_json_cache(filename, key, value):
+    try:
+        os.makedirs(os.path.dirname(filename), exist_ok=True)
+        # replace is atomic, another simview may be starting at the same time
+        tmp = "%s.%d.tmp" % (filename, os.getpid())
+        with open(tmp, 'w') as f:
+            json.dump({'key': key, 'value': value}, f)
+        os.replace(tmp, filename)
+    except OSError as e:
+        print("Startup cache: "+str(e))
+
+# names of example input files, sorted
+def simpson_example_files(path):
+    return sorted(os.path.basename(name) for name in glob.glob(os.path.join(path, "*.in")))
+
+# split keywords to single words (looked up directly) and phrases like 'then ' (matched by expressions)
+def compile_keywords(keys):
+    words = [key for key in keys if re.fullmatch(r"\w+", key)]
+    phrases = [key for key in keys if key and not re.fullmatch(r"\w+", key)]
+    return {'words': words, 'phrases': phrases}
+
+# TCL and SIMPSON keyword tables of the highlighter, cached until the keyword file changes
+def load_keyword_tables(filename, cache_file):
+    stat = os.stat(filename)
+    key = [os.path.abspath(filename), stat.st_size, stat.st_mtime_ns]
+    tables = read_json_cache(cache_file, key)
+    if tables is not None:
+        return tables
+    with open(filename, 'r') as f:
+        keywords = f.read().splitlines()
+    tclstart = keywords.index("[TCL_KeyWords]")
+    simpstart = keywords.index("[SIMPSON_KeyWords]")
+    tables = {'tcl': compile_keywords(keywords[(tclstart+1):simpstart]),
+              'simpson': compile_keywords(keywords[(simpstart+1):])}
+    write_json_cache(cache_file, key, tables)
+    return tables